@@ -1,17 +1,40 @@
+import base64
+import binascii
 import calendar
-from datetime import datetime
+import functools
+import hashlib
+import io
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timedelta
 import joblib
 import traceback
-import requests
 import os
 import json
 import numpy as np
-import pandas as pd
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, has_request_context, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
 import firebase_admin
 from firebase_admin import credentials, firestore
 from dotenv import load_dotenv
+from batcher import MicroBatcher
+from cache import MISSING, TTLCache
+from disk_cache import SQLiteCache
+from features import DemandFeatureAssembler, load_feature_provider
+from flat_forest import LazyArtifact, load_forest
+from gemini import GeminiBusyError, GeminiClient
+from http_cache import EncodedResponse, etag_matches, make_etag
+from images import downscale_image
+from metrics import Registry
+from profiler import SamplingProfiler
+from replica import CropDataReplica
+from singleflight import SingleFlight
+from forecast_table import load_forecast_table
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all domains
@@ -20,13 +43,85 @@ CORS(app)  # Enable CORS for all domains
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-# Load model and encoders
-model = joblib.load("price_model.pkl")
-le_crop = joblib.load("crop_encoder.pkl")
-le_state = joblib.load("state_encoder.pkl")
-demand_model = joblib.load("demand_model.pkl")
-scaler = joblib.load("scalers.pkl")
-label_encoders = joblib.load("label_encoder.pkl")
+# Shared, pooled Gemini client. Calls run on its own thread pool with bounded concurrency.
+gemini = GeminiClient(
+    api_key=GEMINI_API_KEY,
+    base_url=os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com"),
+    model="gemini-1.5-flash",
+    max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", 4)),
+    read_timeout=float(os.getenv("GEMINI_TIMEOUT_SECONDS", 60)),
+    retries=int(os.getenv("GEMINI_RETRIES", 2)),
+    queue_timeout=float(os.getenv("GEMINI_QUEUE_TIMEOUT_SECONDS", 30))
+)
+
+# Persistent cache of per-hectare /fertCalculator answers, keyed by (crop, soil, stage)
+fert_cache = SQLiteCache(
+    os.getenv("FERT_CACHE_PATH", "fert_cache.sqlite3"),
+    max_entries=int(os.getenv("FERT_CACHE_MAX_ENTRIES", 5000)),
+    ttl_seconds=float(os.getenv("FERT_CACHE_TTL_SECONDS", 30 * 24 * 3600))
+)
+
+# Persistent cache of /detectDisease answers, keyed by sha256(image bytes + language)
+disease_cache = SQLiteCache(
+    os.getenv("DISEASE_CACHE_PATH", "disease_cache.sqlite3"),
+    max_entries=int(os.getenv("DISEASE_CACHE_MAX_ENTRIES", 2000)),
+    ttl_seconds=float(os.getenv("DISEASE_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+)
+disease_flights = SingleFlight()
+singleflights = {"disease": disease_flights}
+
+# Uploads to /detectDisease/upload are capped and downscaled before they reach Gemini
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 20 * 1024 * 1024))
+DISEASE_IMAGE_MAX_SIDE = int(os.getenv("DISEASE_IMAGE_MAX_SIDE", 1024))
+
+# Model versions written by model_training/incremental_train.py: MODEL_DIR/CURRENT names the
+# active one and is checked every MODEL_POLL_SECONDS (0 disables). Without it the artifacts
+# are read from this folder.
+MODEL_DIR = os.getenv("MODEL_DIR", "models")
+MODEL_POLL_SECONDS = float(os.getenv("MODEL_POLL_SECONDS", 30))
+
+def read_model_version():
+    try:
+        with open(os.path.join(MODEL_DIR, "CURRENT")) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+model_version = read_model_version()
+# Version the artifacts are loaded from. It runs ahead of model_version while a new
+# version loads; model_version names the new one only once all its artifacts are in use.
+artifact_version = model_version
+
+def artifact_path(name):
+    return os.path.join(MODEL_DIR, artifact_version, name) if artifact_version else name
+
+# Load model and encoders on first use. The forests come from their memory-mapped
+# flat export (model_training/export_flat_models.py) when present.
+model = LazyArtifact(lambda: load_forest(artifact_path("price_model")))
+le_crop = LazyArtifact(lambda: joblib.load(artifact_path("crop_encoder.pkl")))
+le_state = LazyArtifact(lambda: joblib.load(artifact_path("state_encoder.pkl")))
+demand_model = LazyArtifact(lambda: load_forest(artifact_path("demand_model")))
+scaler = LazyArtifact(lambda: joblib.load(artifact_path("scalers.pkl")))
+label_encoders = LazyArtifact(lambda: joblib.load(artifact_path("label_encoder.pkl")))
+demand_features = LazyArtifact(lambda: DemandFeatureAssembler(
+    demand_model.feature_names_in_, scaler.load(), label_encoders.load(), get_additional_features
+))
+
+# Model calls of concurrent requests are queued and run as one batch per BATCH_WINDOW_MS
+# (or BATCH_MAX_ROWS rows) on BATCH_WORKERS threads per model. 0 calls the models directly.
+BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", 2))
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", 256))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", 1))
+
+def make_predictor(name, forest):
+    if BATCH_WINDOW_MS <= 0:
+        return forest
+    return MicroBatcher(
+        lambda X: forest.predict(X), BATCH_WINDOW_MS / 1000, BATCH_MAX_ROWS, BATCH_WORKERS, name=name
+    )
+
+price_predictor = make_predictor("price", model)
+demand_predictor = make_predictor("demand", demand_model)
 
 # Initialize Firebase Admin SDK (use your actual path)
 cred = credentials.Certificate("firebase-adminsdk.json")
@@ -35,34 +130,447 @@ firebase_admin.initialize_app(cred)
 # Get Firestore database reference
 db = firestore.client()
 
-# Function to get weather data (to be replaced with real API calls)
-def get_weather_data(state, month, year):
-    # for future
-    # get the latitude and longitude data from database for the state and pass to API to get weather data
-    return {
-        "temperature": np.random.uniform(20, 45),
-        "rainfall": np.random.uniform(0, 300),
-        "soil_moisture": np.random.uniform(0.1, 0.5),
-        "ndvi": np.random.uniform(0.2, 0.7)
+# Maximum number of documents fetched per batched read
+FIRESTORE_BATCH_SIZE = 100
+
+# Maximum number of months (over all queries) in one /bulkForecast request
+MAX_BULK_MONTHS = int(os.getenv("MAX_BULK_MONTHS", 2400))
+
+# Process-local cache of crop_data/<state>/<crop>/<MM-YYYY> documents, keyed by (state, crop, "MM-YYYY").
+# Snapshot listeners keep it in sync with Firestore, the TTL is only a safety net.
+doc_cache = TTLCache(
+    max_entries=int(os.getenv("DOC_CACHE_MAX_ENTRIES", 50000)),
+    ttl_seconds=float(os.getenv("DOC_CACHE_TTL_SECONDS", 6 * 3600))
+)
+# Snapshot listeners of the crop collections read through doc_cache, least recently used
+# first. Each one is a stream and a thread, so at most MAX_CROP_WATCHES are kept open.
+MAX_CROP_WATCHES = int(os.getenv("MAX_CROP_WATCHES", 1000))
+crop_watches = OrderedDict()
+crop_watches_lock = threading.Lock()
+crop_data_changes = 0  # snapshots with changes delivered to the crop watches
+
+# Local replica of the whole crop_data tree, loaded on a background thread at boot and kept
+# current by snapshot listeners. Reads use Firestore (and doc_cache) until it is loaded
+# or when its last sync is more than REPLICA_MAX_LAG_SECONDS old.
+REPLICA_ENABLED = os.getenv("REPLICA_ENABLED", "1") == "1"
+replica = CropDataReplica(
+    db,
+    sync_seconds=float(os.getenv("REPLICA_SYNC_SECONDS", 60)),
+    max_lag_seconds=float(os.getenv("REPLICA_MAX_LAG_SECONDS", 300))
+)
+if REPLICA_ENABLED:
+    replica.start()
+
+# Weather and market features: deterministic monthly averages of the training data
+# (climatology.pkl from model_training/climatology.py) or random placeholders
+feature_provider = load_feature_provider(
+    os.getenv("FEATURE_PROVIDER", "climatology"), "climatology.pkl", os.getenv("WEATHER_STORE", "weather")
+)
+
+# Memoized model outputs, keyed by (model version, "price", state, crop, year, month) and
+# (model version, "demand", state, crop, year, month, price). Only used with deterministic features.
+prediction_cache = TTLCache(
+    max_entries=int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", 100000)),
+    ttl_seconds=float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", 24 * 3600))
+)
+
+# Forecasts precomputed by model_training/build_forecast_table.py with the climatology
+# features, used instead of the models inside its horizon. A model version only uses
+# the table built into its own folder.
+FORECAST_TABLE = os.getenv("FORECAST_TABLE", "forecast")
+
+def load_model_forecast_table():
+    return load_forecast_table(artifact_path(FORECAST_TABLE)) if feature_provider.deterministic else None
+
+forecast_table = load_model_forecast_table()
+
+# Encoded bodies of the GET/POST forecast and price routes, keyed by route, parameters,
+# model version and crop_data version, so new models or data never serve an old entry.
+# The TTL bounds how long a new crop collection can go unnoticed without the replica.
+response_cache = TTLCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 5000)),
+    ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 300))
+)
+
+# Request, stage and cache metrics of this worker process, served at /metrics
+metrics = Registry()
+request_seconds = metrics.histogram(
+    "krishi_request_duration_seconds", "Request latency by route", ["route", "method", "status"]
+)
+stage_seconds = metrics.histogram(
+    "krishi_stage_duration_seconds",
+    "Time spent in one stage of a request: firestore, features, predict, gemini or serialize",
+    ["route", "stage"]
+)
+cached_responses = metrics.counter(
+    "krishi_http_cache_responses_total",
+    "Responses of the cacheable routes: hit or miss of the response cache, or not_modified (304)",
+    ["route", "result"]
+)
+artifacts = {
+    "price_model": model,
+    "crop_encoder": le_crop,
+    "state_encoder": le_state,
+    "demand_model": demand_model,
+    "scalers": scaler,
+    "label_encoder": label_encoders
+}
+
+def activate_model_version(version):
+    """Loads the artifacts of a model version and swaps them in for the ones in use.
+
+    Encoders of a newer version only append labels, so a request that sees old and new
+    artifacts during the swap still encodes every known label the same way. model_version
+    changes only after the swap: predictions and responses are cached under the version
+    read when they started, so one computed during the swap is never served as the new
+    version's.
+    """
+    global model_version, artifact_version, forecast_table
+    previous = artifact_version
+    artifact_version = version
+    try:
+        table = load_model_forecast_table()
+        for artifact in (*artifacts.values(), demand_features):
+            artifact.reload()
+    except Exception:
+        artifact_version = previous
+        for artifact in (*artifacts.values(), demand_features):
+            artifact.reload()
+        raise
+    forecast_table = table
+    model_version = version
+    prediction_cache.clear()
+    response_cache.clear()
+
+def watch_model_version():
+    failed_version = None
+    while True:
+        time.sleep(MODEL_POLL_SECONDS)
+        version = read_model_version()
+        if version is None or version in (model_version, failed_version):
+            continue
+        try:
+            activate_model_version(version)
+            print(f"✅ Switched to model version {version}")
+        except Exception as e:
+            # Not retried until CURRENT names another version
+            failed_version = version
+            print(f"Error switching to model version {version}: {e}")
+            traceback.print_exc()
+
+if MODEL_POLL_SECONDS > 0:
+    threading.Thread(target=watch_model_version, name="model-version-watch", daemon=True).start()
+
+# Sampling profiler for requests sent with an "X-Profile: 1" header (off unless enabled).
+# The collapsed stacks of the last MAX_PROFILES requests are served at /debug/profiles/<id>.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 5))
+MAX_PROFILES = 20
+profiles = OrderedDict()
+profiles_lock = threading.Lock()
+
+@metrics.collector
+def collect_cache_metrics():
+    caches = {
+        "doc": doc_cache, "prediction": prediction_cache, "response": response_cache,
+        "fertilizer": fert_cache, "disease": disease_cache
     }
+    stats = {name: cache.stats() for name, cache in caches.items()}
+    for field in ("hits", "misses", "evictions"):
+        yield f"krishi_cache_{field}_total", "counter", f"Cache {field}", [
+            ({"cache": name}, cache_stats[field]) for name, cache_stats in stats.items()
+        ]
+    yield "krishi_cache_entries", "gauge", "Entries held by a cache", [
+        ({"cache": name}, cache_stats["entries"]) for name, cache_stats in stats.items()
+    ]
+    yield "krishi_singleflight_coalesced_total", "counter", "Calls that waited for an identical call in flight", [
+        ({"flight": name}, flights.stats()["coalesced"]) for name, flights in singleflights.items()
+    ]
+    yield "krishi_model_load_seconds", "gauge", "Load time of the model artifacts loaded so far", [
+        ({"artifact": name}, artifact.load_seconds) for name, artifact in artifacts.items() if artifact.loaded
+    ]
+    yield "krishi_model_version_info", "gauge", "Model version in use", [
+        ({"version": model_version or "none"}, 1)
+    ]
+
+# Route of a request served outside Flask (the native routes of asgi.py)
+current_asgi_route = ContextVar("current_asgi_route", default="none")
+
+@metrics.collector
+def collect_replica_metrics():
+    if not REPLICA_ENABLED:
+        return
+    stats = replica.stats()
+    lag = replica.lag_seconds()
+    lag_samples = [({}, lag)] if lag is not None else []
+    yield "krishi_replica_lag_seconds", "gauge", "Seconds since the least recently confirmed replica listener was current", lag_samples
+    yield "krishi_replica_fresh", "gauge", "1 if reads are served by the crop_data replica", [
+        ({}, int(replica.fresh()))
+    ]
+    yield "krishi_replica_documents", "gauge", "Month documents held by the crop_data replica", [
+        ({}, stats["documents"])
+    ]
+    yield "krishi_replica_fallbacks_total", "counter", "Reads sent to Firestore because the replica was stale", [
+        ({}, stats["fallbacks"])
+    ]
+    yield "krishi_replica_resubscribes_total", "counter", "Listeners of the replica replaced after their stream died", [
+        ({}, stats["resubscribes"])
+    ]
+
+@metrics.collector
+def collect_inference_metrics():
+    batchers = {
+        name: predictor.stats() for name, predictor in (("price", price_predictor), ("demand", demand_predictor))
+        if isinstance(predictor, MicroBatcher)
+    }
+    yield "krishi_inference_batches_total", "counter", "Batched model calls", [
+        ({"model": name}, stats["batches"]) for name, stats in batchers.items()
+    ]
+    yield "krishi_inference_rows_total", "counter", "Rows predicted in batched model calls", [
+        ({"model": name}, stats["rows"]) for name, stats in batchers.items()
+    ]
+
+def current_route():
+    if has_request_context() and request.url_rule is not None:
+        return request.url_rule.rule
+    return current_asgi_route.get()
+
+def span(stage):
+    """Times a stage of the current request (with span("predict"): ...)."""
+    return stage_seconds.time(route=current_route(), stage=stage)
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Default JSON provider that times response serialization as the "serialize" stage."""
+
+    def response(self, *args, **kwargs):
+        with span("serialize"):
+            return super().response(*args, **kwargs)
+
+app.json = TimedJSONProvider(app)
+
+@app.before_request
+def start_request():
+    g.request_start = time.perf_counter()
+    if PROFILING_ENABLED and request.headers.get("X-Profile") == "1":
+        g.profiler = SamplingProfiler(interval=PROFILE_INTERVAL_MS / 1000).start()
+
+@app.after_request
+def finish_request(response):
+    if "request_start" in g:
+        request_seconds.observe(
+            time.perf_counter() - g.request_start,
+            route=current_route(), method=request.method, status=response.status_code
+        )
+
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profile_id = uuid.uuid4().hex
+        with profiles_lock:
+            profiles[profile_id] = profiler.stop()
+            while len(profiles) > MAX_PROFILES:
+                profiles.popitem(last=False)
+        response.headers["X-Profile-Id"] = profile_id
+    return response
+
+# Query string fields read as integers by the GET variants of the JSON routes
+INT_PARAMS = {"startYear", "startMonth", "endYear", "endMonth", "year", "month"}
+
+def request_params():
+    """Fields of a request: the JSON body of a POST, the query string of a GET."""
+    if request.method == "POST":
+        return request.json
+    params = request.args.to_dict()
+    for name in INT_PARAMS & params.keys():
+        if params[name].lstrip("-").isdigit():
+            params[name] = int(params[name])
+    return params
+
+def year_month(data):
+    """(year, month) of a request as ints, None for a field that is missing or not a number."""
+    def as_int(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    return as_int(data.get("year")), as_int(data.get("month"))
+
+def data_version():
+    """Changes to crop_data seen so far by the replica and by the crop watches."""
+    return replica.version, crop_data_changes
+
+def cacheable(view):
+    """Serves a JSON route with ETags, conditional GETs, compression and the response cache.
+
+    The ETag hashes the body and names the model version, so every worker gives the same
+    answer the same ETag and a GET with a matching If-None-Match gets a 304 even when the
+    body had to be computed again. Compressed variants add their content coding to it. Bodies are cached only with deterministic features,
+    and only successful ones. Identical requests that miss the cache while one of them is
+    being computed wait for it and share its response (singleflights[view name]).
+    """
+    flights = singleflights[view.__name__] = SingleFlight()
+
+    def compute(key, version):
+        response = app.make_response(view())
+        body = response.get_data()
+        entry = EncodedResponse(body, make_etag(body, version or "base"), response.content_type)
+        if response.status_code == 200 and feature_provider.deterministic:
+            response_cache.set(key, entry)
+        return response.status_code, entry
+
+    @functools.wraps(view)
+    def wrapper():
+        version = model_version
+        key = (request.path, json.dumps(request_params(), sort_keys=True), version, data_version())
+        entry = response_cache.get(key) if feature_provider.deterministic else MISSING
+        result = "hit"
+        if entry is MISSING:
+            result = "miss"
+            status_code, entry = flights.do(key, lambda: compute(key, version))
+            if status_code != 200:
+                return Response(entry.body, status=status_code, content_type=entry.content_type)
+
+        encoding = entry.encoding(request.headers.get("Accept-Encoding"))
+        etag = entry.etag_for(encoding)
+        if request.method in ("GET", "HEAD") and etag_matches(request.headers.get("If-None-Match"), etag):
+            cached_responses.inc(route=current_route(), result="not_modified")
+            response = Response(status=304)
+        else:
+            cached_responses.inc(route=current_route(), result=result)
+            response = Response(entry.encoded(encoding), content_type=entry.content_type)
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+    return wrapper
+
+def get_weather_data(states, months, years):
+    """len(states) x (temperature, rainfall, soil_moisture, ndvi) array, one row per (state, month, year)."""
+    return feature_provider.weather_many(states, months, years)
 
 def get_additional_features(state, crop, month, year):
-    return {
-        "seasonality": np.random.uniform(0.5, 1.5),
-        "marketing_spend": np.random.uniform(10000, 50000),
-        "competitor_price": np.random.uniform(10, 50),
-        "special_event": np.random.choice([0, 1], p=[0.8, 0.2]),
-        "supply": np.random.uniform(500, 2000)
-    }
+    return feature_provider.market(state, crop, month, year)
+
+def lookup_prediction(key, version):
+    """Returns the precomputed or memoized prediction of a model version for key, or MISSING."""
+    if forecast_table is not None:
+        prediction = forecast_table.lookup(key)
+        if prediction is not None:
+            return prediction
+    return prediction_cache.get((version, *key))
+
+def memoized_predict(keys, predict_rows):
+    """Returns one prediction per key from the forecast table or the prediction cache.
+
+    predict_rows(positions) is called once with the positions of the keys that are not
+    cached yet and must return their predictions in the same order.
+    """
+    if not keys:
+        return []
+    if not feature_provider.deterministic:
+        return list(predict_rows(list(range(len(keys)))))
+
+    version = model_version
+    predictions = [lookup_prediction(key, version) for key in keys]
+    missing = [i for i, prediction in enumerate(predictions) if prediction is MISSING]
+    if missing:
+        for i, prediction in zip(missing, predict_rows(missing)):
+            prediction_cache.set((version, *keys[i]), prediction)
+            predictions[i] = prediction
+    return predictions
+
+def month_range(start_year, start_month, end_year, end_month):
+    """Returns the (year, month) pairs from the start month to the end month, inclusive."""
+    months = []
+    current_date = datetime(start_year, start_month, 1)
+    end_date = datetime(end_year, end_month, 1)
+
+    while current_date <= end_date:
+        year, month = current_date.year, current_date.month
+        months.append((year, month))
+
+        # Move to the next month
+        current_date = datetime(year + (month // 12), (month % 12) + 1, 1)
+    return months
+
+def month_count(start_year, start_month, end_year, end_month):
+    """Number of months month_range returns, without expanding them (ValueError/TypeError if invalid)."""
+    for value in (start_year, start_month, end_year, end_month):
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise TypeError(f"expected integer years and months, got {value!r}")
+    for year, month in ((start_year, start_month), (end_year, end_month)):
+        if not datetime.min.year <= year <= datetime.max.year or not 1 <= month <= 12:
+            raise ValueError(f"month {month} of year {year} is out of range")
+    return max((end_year - start_year) * 12 + end_month - start_month + 1, 0)
+
+def build_price_features(keys):
+    """Builds the price model input matrix, one row per ("price", state, crop, year, month) key."""
+    state_codes = {label: code for code, label in enumerate(le_state.classes_)}
+    crop_codes = {label: code for code, label in enumerate(le_crop.classes_)}
+
+    input_data = np.empty((len(keys), 8))
+    if not keys:
+        return input_data
+    _, states, crops, years, months = zip(*keys)
+    input_data[:, 0] = [state_codes[state] for state in states]
+    input_data[:, 1] = [crop_codes[crop] for crop in crops]
+    input_data[:, 2] = years
+    input_data[:, 3] = months
+    # Weather of all rows at once
+    input_data[:, 4:] = get_weather_data(states, months, years)
+    return input_data
+
+def build_demand_features(keys):
+    """Builds the scaled demand model input, one row per ("demand", state, crop, year, month, price) key."""
+    return demand_features.build(keys)
+
+def predict_price_keys(keys):
+    """Predicts the price of ("price", state, crop, year, month) keys of known states and crops.
+
+    Uncached keys of any state and crop are predicted with a single model call.
+    """
+    def predict_rows(missing):
+        with span("features"):
+            X = build_price_features([keys[i] for i in missing])
+        with span("predict"):
+            return price_predictor.predict(X)
+    return memoized_predict(keys, predict_rows)
+
+def predict_demand_keys(keys):
+    """Predicts the demand of ("demand", state, crop, year, month, price) keys of known states and crops.
+
+    Uncached keys of any state and crop are predicted with a single model call.
+    """
+    def predict_rows(missing):
+        with span("features"):
+            X = build_demand_features([keys[i] for i in missing])
+        with span("predict"):
+            return demand_predictor.predict(X)
+    return memoized_predict(keys, predict_rows)
 
 @app.route('/')
 def home():
     return "Crop Price Prediction API is running!"
 
-@app.route('/predict', methods=['POST'])
+@app.route('/metrics')
+def get_metrics():
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.route('/debug/profiles/<profile_id>')
+def get_profile(profile_id):
+    with profiles_lock:
+        stacks = profiles.get(profile_id)
+    if stacks is None:
+        return jsonify({"error": "Unknown profile"}), 404
+    return Response(stacks, content_type="text/plain; charset=utf-8")
+
+@app.route('/predict', methods=['GET', 'POST'])
+@cacheable
 def predict():
-    print("Received Data:", request.json)  # Print received request
-    data = request.json
+    data = request_params()
+    print("Received Data:", data)  # Print received request
     state = data.get("state")
     crop = data.get("crop")
     start_year = data.get("startYear")
@@ -74,44 +582,22 @@ def predict():
         return jsonify({"error": "Missing required fields"}), 400
 
     try:
-        # Encode state and crop
-        state_encoded = le_state.transform([state])[0]
-        crop_encoded = le_crop.transform([crop])[0]
-
-        predictions = []
-        current_date = datetime(start_year, start_month, 1)
-        end_date = datetime(end_year, end_month, 1)
-
-        while current_date <= end_date:
-            year = current_date.year
-            month = current_date.month
-
-            # Fetch weather data
-            weather = get_weather_data(state, month, year)
-
-            # Create input for model
-            input_data = np.array([
-                state_encoded,
-                crop_encoded,
-                year,
-                month,
-                weather["temperature"],
-                weather["rainfall"],
-                weather["soil_moisture"],
-                weather["ndvi"]
-            ]).reshape(1, -1)
-
-            # Predict price
-            predicted_price = model.predict(input_data)
-            predictions.append({
-                "month": f"{calendar.month_name[month]} {year}",
-                "price": round(predicted_price[0], 2)
-            })
+        # Check state and crop (raises for unseen labels)
+        le_state.transform([state])
+        le_crop.transform([crop])
 
-            # Move to the next month
-            next_month = month + 1 if month < 12 else 1
-            next_year = year if month < 12 else year + 1
-            current_date = datetime(next_year, next_month, 1)
+        months = month_range(start_year, start_month, end_year, end_month)
+
+        # Predict the whole range with a single model call (cached months are skipped)
+        predicted_prices = predict_price_keys([("price", state, crop, year, month) for year, month in months])
+
+        predictions = [
+            {
+                "month": f"{calendar.month_name[month]} {year}",
+                "price": round(price, 2)
+            }
+            for (year, month), price in zip(months, predicted_prices)
+        ]
 
         return jsonify(predictions)
 
@@ -120,83 +606,172 @@ def predict():
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
     
-@app.route('/pastPrices', methods=['POST'])
+@app.route('/pastPrices', methods=['GET', 'POST'])
+@cacheable
 def get_past_prices():
-    data = request.json
+    data = request_params()
     state = data.get("state")
     crop = data.get("crop")
-    year = int(data.get("year"))
-    month = int(data.get("month"))
+    year, month = year_month(data)
 
     if not state or not crop or not year or not month:
         return jsonify({"error": "Missing required fields"}), 400
 
     try:
-        past_prices = []
-        current_date = datetime(year, month, 1)
-
-        # Get past 6 months
-        for i in range(6):
-            past_year = current_date.year
-            past_month = current_date.month
-
-            # Convert to database format "MM-YYYY"
-            db_month = f"{past_month:02d}-{past_year}"
+        # Get past 6 months in database format "MM-YYYY"
+        months = previous_months(year, month)
+        cells = [(crop, f"{past_month:02d}-{past_year}") for past_year, past_month in months]
 
-            # Fetch price from database if not present then predict
-            record = fetch_price_from_db(state, crop, db_month)
-
-            if not record.empty:
-                price = record.iloc[0]["price"]
-            else:
-                # Predict price if not found in database
-                price = predict_price(state, crop, db_month)
-
-            past_prices.append({
-                "month": f"{calendar.month_name[past_month]} {past_year}",
-                "price": price
-            })
-            
-            # Move to the previous month
-            previous_month = past_month - 1 if past_month > 1 else 12
-            previous_year = past_year if past_month > 1 else past_year - 1
-            current_date = datetime(previous_year, previous_month, 1)
-
-        return jsonify(past_prices)
+        # Fetch prices from database, then predict the missing ones
+        docs = read_month_docs(state, cells)
+        return jsonify(past_prices_from_docs(state, months, cells, docs))
     
     except Exception as e:
             return jsonify({"error": str(e)}), 500
 
-def fetch_price_from_db(state, crop, db_month):
+def past_prices_from_docs(state, months, cells, docs):
+    """/pastPrices rows: stored price of each month, missing ones predicted with a single model call."""
+    prices = [(docs[cell] or {}).get('price') for cell in cells]
+    missing = [i for i, price in enumerate(prices) if price is None]
+    for i, price in zip(missing, predict_prices(state, [cells[i] for i in missing])):
+        prices[i] = price
+
+    return [
+        {
+            "month": f"{calendar.month_name[past_month]} {past_year}",
+            "price": price
+        }
+        for (past_year, past_month), price in zip(months, prices)
+    ]
+
+def previous_months(year, month, count=6):
+    """(year, month) pairs of the given month and the count - 1 months before it, newest first."""
+    months = []
+    current_date = datetime(year, month, 1)
+    for _ in range(count):
+        months.append((current_date.year, current_date.month))
+        current_date = current_date.replace(day=1) - timedelta(days=1)
+    return months
+
+def read_month_docs(state, cells):
+    """fetch_month_docs for routes that fall back to predictions: read errors count as missing documents."""
     try:
-        # Fetch the document for the specific state and crop
-        state_doc_ref = db.collection('crop_data').document(state)
-        crop_collection_ref = state_doc_ref.collection(crop)
-
-        # Fetch the document for the specific month
-        month_doc_ref = crop_collection_ref.document(db_month)
-        month_doc_snapshot = month_doc_ref.get()
-
-        if month_doc_snapshot.exists:
-            month_data = month_doc_snapshot.to_dict()
-            if 'price' in month_data:
-                # Create a DataFrame with the fetched price
-                data = {
-                    "price": [month_data['price']],
-                    "month": [db_month]
-                }
-                return pd.DataFrame(data)
-        
-        # Return an empty DataFrame if no price is found
-        return pd.DataFrame()
+        return fetch_month_docs(state, cells)
+    except Exception as e:
+        print(f"Error fetching from database: {e}")
+        return {cell: None for cell in cells}
+
+def replica_ready():
+    """True if reads can be served by the crop_data replica, else counts a fallback to Firestore."""
+    if not REPLICA_ENABLED:
+        return False
+    if replica.fresh():
+        return True
+    replica.count_fallback()
+    return False
+
+def fetch_month_docs(state, cells):
+    """Read-through fetch of the month documents of many (crop, "MM-YYYY") cells of one state.
+
+    Returns {cell: document data}, with None for missing documents. Served by the replica
+    when it is fresh; otherwise cache misses are fetched with batched reads and the crop
+    collections they belong to are watched.
+    """
+    if replica_ready():
+        return replica.get(state, cells)
+
+    docs, doc_refs = {}, {}
+    state_doc_ref = db.collection('crop_data').document(state)
+    for crop, db_month in cells:
+        month_data = doc_cache.get((state, crop, db_month))
+        if month_data is MISSING:
+            month_doc_ref = state_doc_ref.collection(crop).document(db_month)
+            doc_refs[month_doc_ref.path] = (month_doc_ref, (crop, db_month))
+        else:
+            docs[(crop, db_month)] = month_data
+
+    pending = list(doc_refs.values())
+    for start in range(0, len(pending), FIRESTORE_BATCH_SIZE):
+        chunk = [month_doc_ref for month_doc_ref, _ in pending[start:start + FIRESTORE_BATCH_SIZE]]
+        with span("firestore"):
+            snapshots = list(db.get_all(chunk))
+        for snapshot in snapshots:
+            crop, db_month = doc_refs[snapshot.reference.path][1]
+            docs[(crop, db_month)] = snapshot.to_dict() if snapshot.exists else None
+
+    cache_fetched_docs(state, {cell: docs.get(cell) for _, cell in pending})
+
+    for cell in cells:
+        docs.setdefault(cell, None)
+    return docs
+
+def cache_fetched_docs(state, fetched):
+    """Caches {(crop, "MM-YYYY"): document data} read from Firestore and watches their crops.
+
+    Only collections that exist (one of the documents was found) or whose state and crop
+    the models know are watched, so names made up in requests don't open listeners.
+    Documents of collections that are not watched are not cached either, and a read
+    never replaces an entry the listener wrote meanwhile.
+    """
+    found = {crop for (crop, _), month_data in fetched.items() if month_data is not None}
+    for crop in {crop for crop, _ in fetched}:
+        if crop in found or (state in le_state.classes_ and crop in le_crop.classes_):
+            watch_crop_collection(state, crop)
+            for (fetched_crop, db_month), month_data in fetched.items():
+                if fetched_crop == crop:
+                    doc_cache.set_if_missing((state, crop, db_month), month_data)
+
+def watch_crop_collection(state, crop):
+    """Keeps the cached documents of crop_data/<state>/<crop> in sync through a snapshot listener.
+
+    Beyond MAX_CROP_WATCHES the least recently used listener is closed and the cached
+    documents of its collection are dropped.
+    """
+    with crop_watches_lock:
+        if (state, crop) in crop_watches:
+            crop_watches.move_to_end((state, crop))
+            return
+        crop_watches[(state, crop)] = None
+        evicted = []
+        while len(crop_watches) > MAX_CROP_WATCHES:
+            evicted.append(crop_watches.popitem(last=False))
+
+    for (evicted_state, evicted_crop), watch in evicted:
+        if watch is not None:
+            watch.unsubscribe()
+        doc_cache.invalidate_where(lambda key: key[:2] == (evicted_state, evicted_crop))
+
+    def on_snapshot(collection_snapshot, changes, read_time):
+        global crop_data_changes
+        if (state, crop) not in crop_watches:
+            return
+        for change in changes:
+            key = (state, crop, change.document.id)
+            if change.type.name == 'REMOVED':
+                doc_cache.set(key, None)
+            else:
+                doc_cache.set(key, change.document.to_dict())
+        if changes:
+            with crop_watches_lock:
+                crop_data_changes += 1
 
+    try:
+        crop_collection_ref = db.collection('crop_data').document(state).collection(crop)
+        watch = crop_collection_ref.on_snapshot(on_snapshot)
+        with crop_watches_lock:
+            evicted = (state, crop) not in crop_watches
+            if not evicted:
+                crop_watches[(state, crop)] = watch
+        if evicted:
+            watch.unsubscribe()
     except Exception as e:
-        print(f"Error fetching price from database: {e}")
-        return pd.DataFrame()
-    
-@app.route('/cropsCollection', methods=['POST'])
+        # Without a listener the entries of this crop only expire through the TTL
+        print(f"Error watching {state}/{crop} for changes: {e}")
+
+@app.route('/cropsCollection', methods=['GET', 'POST'])
+@cacheable
 def crops_collection():
-    data = request.json
+    data = request_params()
     selected_state = data.get("selectedState")
     previous_month = data.get("previousMonth")
     next_month = data.get("nextMonth")
@@ -206,101 +781,89 @@ def crops_collection():
 
     try:
         # 🔹 Get all collections inside the selected state (list of crops)
-        state_doc_ref = db.collection('crop_data').document(selected_state)
-        crops_collections = state_doc_ref.collections()
-
-        fetched_crops = []
-
-        for crop_collection in crops_collections:
-            crop_name = crop_collection.id  # Crop name
-
-            # 🔹 Get previous and next month documents
-            previous_month_doc_ref = crop_collection.document(previous_month)
-            next_month_doc_ref = crop_collection.document(next_month)
-
-            # 🔹 Fetch previous month price & demand
-            previous_month_snapshot = previous_month_doc_ref.get()
-            previous_month_price = 0
-            previous_month_demand = 0
-
-            if previous_month_snapshot.exists:
-                doc_data = previous_month_snapshot.to_dict()
-                previous_month_price = doc_data.get('price', 0)
-                previous_month_demand = doc_data.get('demand', 0)
-
-            # Predict if missing
-            if previous_month_price == 0:
-                previous_month_price = predict_price(selected_state, crop_name, previous_month)
-            if previous_month_demand == 0:
-                previous_month_demand = predict_demand_value(selected_state, crop_name, previous_month)
-
-            # 🔹 Fetch next month price & demand
-            next_month_snapshot = next_month_doc_ref.get()
-            next_month_price = 0
-            next_month_demand = 0
-
-            if next_month_snapshot.exists:
-                doc_data = next_month_snapshot.to_dict()
-                next_month_price = doc_data.get('price', 0)
-                next_month_demand = doc_data.get('demand', 0)
-
-            # Predict if missing
-            if next_month_price == 0:
-                next_month_price = predict_price(selected_state, crop_name, next_month)
-            if next_month_demand == 0:
-                next_month_demand = predict_demand_value(selected_state, crop_name, next_month)
-
-            # Store result
-            fetched_crops.append({
-                "name": crop_name,
-                "previousMonthPrice": previous_month_price,
-                "nextMonthPrice": next_month_price,
-                "previousMonthDemand": previous_month_demand,
-                "nextMonthDemand": next_month_demand,
-            })
-
-        return jsonify({"crops": fetched_crops})
+        if replica_ready():
+            crop_names = replica.crops(selected_state)
+        else:
+            state_doc_ref = db.collection('crop_data').document(selected_state)
+            with span("firestore"):
+                crop_names = [crop_collection.id for crop_collection in state_doc_ref.collections()]
+
+        # 🔹 Get previous and next month documents of every crop in batched reads
+        cells = [(crop_name, month) for crop_name in crop_names for month in (previous_month, next_month)]
+        docs = fetch_month_docs(selected_state, cells)
+
+        return jsonify({"crops": crops_from_docs(selected_state, crop_names, previous_month, next_month, docs)})
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def crops_from_docs(selected_state, crop_names, previous_month, next_month, docs):
+    """/cropsCollection rows from the month documents of every crop, missing values predicted."""
+    cells = [(crop_name, month) for crop_name in crop_names for month in (previous_month, next_month)]
+    prices, demands = {}, {}
+    for cell in cells:
+        doc_data = docs[cell] or {}
+        prices[cell] = doc_data.get('price', 0)
+        demands[cell] = doc_data.get('demand', 0)
+
+    # Predict if missing, one model call for all missing prices and one for all missing demands
+    missing = [cell for cell in cells if prices[cell] == 0]
+    prices.update(zip(missing, predict_prices(selected_state, missing)))
+
+    missing = [cell for cell in cells if demands[cell] == 0]
+    missing_prices = [prices[cell] for cell in missing]
+    demands.update(zip(missing, predict_demand_values(selected_state, missing, missing_prices)))
+
+    return [
+        {
+            "name": crop_name,
+            "previousMonthPrice": prices[(crop_name, previous_month)],
+            "nextMonthPrice": prices[(crop_name, next_month)],
+            "previousMonthDemand": demands[(crop_name, previous_month)],
+            "nextMonthDemand": demands[(crop_name, next_month)],
+        }
+        for crop_name in crop_names
+    ]
+
+
+def parse_db_month(db_month):
+    """Splits a database month string (e.g., "01-2023") into (year, month)."""
+    month, year = db_month.split('-')
+    return int(year), int(month)
+
+def predict_prices(state, cells):
+    """Predicts the price of many (crop, "MM-YYYY") cells of one state with a single model call."""
+    prices = [100] * len(cells)  # Default price if prediction fails
 
-def predict_price(state, crop, month):
     try:
-        # Encode state and crop
-        state_encoded = le_state.transform([state])[0]
-        crop_encoded = le_crop.transform([crop])[0]
-
-        # Extract year and month from the month string (e.g., "01-2023")
-        year = int(month.split('-')[1])
-        month = int(month.split('-')[0])
-
-        # Fetch weather data
-        weather = get_weather_data(state, month, year)
-
-        # Create input for model
-        input_data = np.array([
-            state_encoded,
-            crop_encoded,
-            year,
-            month,
-            weather["temperature"],
-            weather["rainfall"],
-            weather["soil_moisture"],
-            weather["ndvi"]
-        ]).reshape(1, -1)
-
-        # Predict price
-        predicted_price = model.predict(input_data)
-        return round(predicted_price[0], 2)
+        if state not in le_state.classes_:
+            raise ValueError(f"unseen state '{state}'")
+
+        rows, keys = [], []
+        for i, (crop, month) in enumerate(cells):
+            try:
+                if crop not in le_crop.classes_:
+                    raise ValueError(f"unseen crop '{crop}'")
+                year, month = parse_db_month(month)
+            except ValueError as e:
+                print(f"Error predicting price for {crop} {month}: {e}")
+                continue
+            rows.append(i)
+            keys.append(("price", state, crop, year, month))
+
+        # Predict price (cached cells are skipped)
+        for i, predicted_price in zip(rows, predict_price_keys(keys)):
+            prices[i] = round(predicted_price, 2)
+        return prices
 
     except Exception as e:
         print(f"Error predicting price: {e}")
-        return 100  # Default price if prediction fails
+        return prices
     
-@app.route('/predict_demand', methods=['POST'])
+@app.route('/predict_demand', methods=['GET', 'POST'])
+@cacheable
 def predict_demand():
-    data = request.json
+    data = request_params()
     state = data.get("state")
     crop = data.get("crop")
     start_year = data.get("startYear")
@@ -312,182 +875,242 @@ def predict_demand():
         return jsonify({"error": "Missing required fields"}), 400
 
     try:
-        state_encoded = le_state.transform([state])[0]
-        crop_encoded = le_crop.transform([crop])[0]
-        predictions = []
-        current_date = datetime(start_year, start_month, 1)
-        end_date = datetime(end_year, end_month, 1)
-
-        while current_date <= end_date:
-            year, month = current_date.year, current_date.month
-            additional_features = get_additional_features(state, crop, month, year)
-            price = get_price_or_predict(state, crop, year, month)
-
-            # Function to safely encode categorical values
-            def safe_encode(label_encoder, value):
-                """Encodes a categorical value using LabelEncoder, handling unseen labels."""
-                if value in label_encoder.classes_:
-                    return label_encoder.transform([value])[0]  # Encode if it exists
-                else:
-                    print(f"⚠ Warning: Unseen label '{value}' detected. Using default encoding (0).")
-                    return 0  # Assign a default value (e.g., 0) for unseen labels
-                
-            # Define numerical columns (same as in training)
-            numerical_cols = ["price", "marketing_spend", "competitor_price", "supply"]
-
-            # Encode categorical variables safely
-            state_encoded = safe_encode(label_encoders["state"], state)
-            crop_encoded = safe_encode(label_encoders["crop"], crop)
-
-            # Prepare input data as a dictionary
-            input_data = {
-                "state": state_encoded, 
-                "crop": crop_encoded, 
-                "year": year, 
-                "month": month,
-                "seasonality": additional_features["seasonality"],
-                "special_event": additional_features["special_event"],
-                "price": price,
-                "marketing_spend": additional_features["marketing_spend"],
-                "competitor_price": additional_features["competitor_price"],
-                "supply": additional_features["supply"]
-            }
-
-            # Convert to DataFrame with correct column names
-            input_df = pd.DataFrame([input_data])
-
-            # Apply scaling to numerical features
-            input_df[numerical_cols] = scaler.transform(input_df[numerical_cols])
-
-            # Ensure input order matches what the model expects
-            input_df = input_df.reindex(columns=demand_model.feature_names_in_)
+        # Check state and crop (raises for unseen labels)
+        le_state.transform([state])
+        le_crop.transform([crop])
+        months = month_range(start_year, start_month, end_year, end_month)
 
-            # Predict demand
-            predicted_demand = float(demand_model.predict(input_df)[0])  # Convert to float
+        demands = forecast_cells([(state, crop, year, month) for year, month in months], ["demand"])["demand"]
 
-            predictions.append({
+        predictions = [
+            {
                 "month": f"{calendar.month_name[month]} {year}",
-                "demand": round(predicted_demand, 2)
-            })
-            
-            current_date = datetime(year + (month // 12), (month % 12) + 1, 1)
+                "demand": demand
+            }
+            for (year, month), demand in zip(months, demands)
+        ]
         
         return jsonify(predictions)
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
-@app.route('/pastDemand', methods=['POST'])
+@app.route('/pastDemand', methods=['GET', 'POST'])
+@cacheable
 def get_past_demand():
-    data = request.json
+    data = request_params()
     state, crop = data.get("state"), data.get("crop")
-    year, month = int(data.get("year")), int(data.get("month"))
+    year, month = year_month(data)
 
     if not state or not crop or not year or not month:
         return jsonify({"error": "Missing required fields"}), 400
 
     try:
-        past_demand = []
-        current_date = datetime(year, month, 1)
-
-        for _ in range(6):
-            past_year, past_month = current_date.year, current_date.month
-            db_month = f"{past_month:02d}-{past_year}"
-            record = fetch_demand_from_db(state, crop, db_month)
-            demand = record.iloc[0]["demand"] if not record.empty else predict_demand_value(state, crop, db_month)
-
-            past_demand.append({"month": f"{calendar.month_name[past_month]} {past_year}", "demand": demand})
-            current_date = datetime(past_year if past_month > 1 else past_year - 1, past_month - 1 if past_month > 1 else 12, 1)
-        
-        return jsonify(past_demand)
+        months = previous_months(year, month)
+        cells = [(crop, f"{past_month:02d}-{past_year}") for past_year, past_month in months]
+        docs = read_month_docs(state, cells)
+        return jsonify(past_demand_from_docs(state, months, cells, docs))
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-def fetch_demand_from_db(state, crop, db_month):
+def past_demand_from_docs(state, months, cells, docs):
+    """/pastDemand rows: stored demand of each month, missing ones predicted."""
+    demands = [(docs[cell] or {}).get('demand') for cell in cells]
+
+    # Months without a stored demand: stored or predicted price (one model call), then one demand model call
+    missing = [cells[i] for i, demand in enumerate(demands) if demand is None]
+    prices = {cell: (docs[cell] or {}).get('price') for cell in missing}
+    unpriced = [cell for cell in missing if prices[cell] is None]
+    prices.update(zip(unpriced, predict_prices(state, unpriced)))
+    predicted = dict(zip(missing, predict_demand_values(state, missing, [prices[cell] for cell in missing])))
+
+    return [
+        {"month": f"{calendar.month_name[past_month]} {past_year}", "demand": predicted.get(cell, demand)}
+        for (past_year, past_month), cell, demand in zip(months, cells, demands)
+    ]
+
+def predict_demand_values(state, cells, prices):
+    """Predicts the demand of many (crop, "MM-YYYY") cells of one state with a single model call.
+
+    prices holds the known or predicted price of each cell.
+    """
+    demands = [100] * len(cells)  # Default demand if prediction fails
+
     try:
-        state_doc_ref = db.collection('crop_data').document(state)
-        crop_collection_ref = state_doc_ref.collection(crop)
-        month_doc_ref = crop_collection_ref.document(db_month)
-        month_doc_snapshot = month_doc_ref.get()
-        
-        if month_doc_snapshot.exists and 'demand' in month_doc_snapshot.to_dict():
-            return pd.DataFrame({"demand": [month_doc_snapshot.to_dict()['demand']], "month": [db_month]})
-        
-        return pd.DataFrame()
+        if state not in le_state.classes_:
+            raise ValueError(f"unseen state '{state}'")
+
+        rows, keys = [], []
+        for i, ((crop, month), price) in enumerate(zip(cells, prices)):
+            try:
+                if crop not in le_crop.classes_:
+                    raise ValueError(f"unseen crop '{crop}'")
+                year, month = parse_db_month(month)
+            except ValueError as e:
+                print(f"Error predicting demand for {crop} {month}: {e}")
+                continue
+            rows.append(i)
+            keys.append(("demand", state, crop, year, month, price))
+
+        # Predict demand (cached cells are skipped)
+        for i, predicted_demand in zip(rows, predict_demand_keys(keys)):
+            demands[i] = round(float(predicted_demand), 2)  # Convert to float
+        return demands
+
     except Exception as e:
-        print(f"Error fetching demand from database: {e}")
-        return pd.DataFrame()
+        print(f"Error predicting demand: {e}")
+        return demands
+
+
+def forecast_cells(cells, series=("price", "demand")):
+    """Fused price and demand pipeline for (state, crop, year, month) cells of known states and crops.
+
+    Returns {series: values}. Prices are model predictions as in /predict; demand uses the
+    stored price of a month when there is one, as in /predict_demand. Stored prices are read
+    in one batch per state, and each model runs once for all cells.
+    """
+    # Stored prices where Firestore has them, batched per state
+    stored = {}
+    if "demand" in series:
+        for state in {state for state, _, _, _ in cells}:
+            state_cells = {(state, crop, year, month) for s, crop, year, month in cells if s == state}
+            docs = read_month_docs(state, [(crop, f"{month:02d}-{year}") for _, crop, year, month in state_cells])
+            for cell in state_cells:
+                month_data = docs[(cell[1], f"{cell[3]:02d}-{cell[2]}")]
+                if month_data and 'price' in month_data:
+                    stored[cell] = month_data['price']
+
+    # One price model call, for every cell or only for those the demand needs a price for
+    priced = list(cells) if "price" in series else [cell for cell in cells if cell not in stored]
+    prices = dict(zip(priced, (round(price, 2) for price in predict_price_keys([("price",) + cell for cell in priced]))))
+
+    values = {}
+    if "price" in series:
+        values["price"] = [prices[cell] for cell in cells]
+    if "demand" in series:
+        # One demand model call, the whole feature block scaled at once
+        demand_keys = [("demand",) + cell + (stored[cell] if cell in stored else prices[cell],) for cell in cells]
+        values["demand"] = [round(float(demand), 2) for demand in predict_demand_keys(demand_keys)]
+    return values
+
+
+@app.route('/forecast', methods=['POST'])
+def forecast():
+    """Price and demand series of one state and crop over a month range.
+
+    Same body as /predict and /predict_demand; returns [{"month", "price", "demand"}, ...]
+    with the values those two routes give, computed in one pass.
+    """
+    data = request.json
+    state = data.get("state")
+    crop = data.get("crop")
+    start_year = data.get("startYear")
+    start_month = data.get("startMonth")
+    end_year = data.get("endYear")
+    end_month = data.get("endMonth")
+
+    if not state or not crop or not start_year or not start_month or not end_year or not end_month:
+        return jsonify({"error": "Missing required fields"}), 400
 
-def predict_demand_value(state, crop, month):
     try:
-        state_encoded, crop_encoded = le_state.transform([state])[0], le_crop.transform([crop])[0]
-        year, month = int(month.split('-')[1]), int(month.split('-')[0])
+        # Check state and crop (raises for unseen labels)
+        le_state.transform([state])
+        le_crop.transform([crop])
+        months = month_range(start_year, start_month, end_year, end_month)
 
-        additional_features = get_additional_features(state, crop, month, year)
-        price = get_price_or_predict(state, crop, year, month)
+        series = forecast_cells([(state, crop, year, month) for year, month in months])
 
-        # Function to safely encode categorical values
-        def safe_encode(label_encoder, value):
-            """Encodes a categorical value using LabelEncoder, handling unseen labels."""
-            if value in label_encoder.classes_:
-                return label_encoder.transform([value])[0]  # Encode if it exists
-            else:
-                print(f"⚠ Warning: Unseen label '{value}' detected. Using default encoding (0).")
-                return 0  # Assign a default value (e.g., 0) for unseen labels
-            
-        # Define numerical columns (same as in training)
-        numerical_cols = ["price", "marketing_spend", "competitor_price", "supply"]
-
-        # Encode categorical variables safely
-        state_encoded = safe_encode(label_encoders["state"], state)
-        crop_encoded = safe_encode(label_encoders["crop"], crop)
-
-        # Prepare input data as a dictionary
-        input_data = {
-            "state": state_encoded, 
-            "crop": crop_encoded, 
-            "year": year, 
-            "month": month,
-            "seasonality": additional_features["seasonality"],
-            "special_event": additional_features["special_event"],
-            "price": price,
-            "marketing_spend": additional_features["marketing_spend"],
-            "competitor_price": additional_features["competitor_price"],
-            "supply": additional_features["supply"]
-        }
-
-        # Convert to DataFrame with correct column names
-        input_df = pd.DataFrame([input_data])
+        predictions = [
+            {
+                "month": f"{calendar.month_name[month]} {year}",
+                "price": price,
+                "demand": demand
+            }
+            for (year, month), price, demand in zip(months, series["price"], series["demand"])
+        ]
 
-        # Apply scaling to numerical features
-        input_df[numerical_cols] = scaler.transform(input_df[numerical_cols])
+        return jsonify(predictions)
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
 
-        # Ensure input order matches what the model expects
-        input_df = input_df.reindex(columns=demand_model.feature_names_in_)
 
-        # Predict demand
-        predicted_demand = float(demand_model.predict(input_df)[0])  # Convert to float
+@app.route('/bulkForecast', methods=['POST'])
+def bulk_forecast():
+    """Price and demand series for many (state, crop, month range) queries in one request.
 
-        return round(predicted_demand, 2)
-    except Exception as e:
-        print(f"Error predicting demand: {e}")
-        return 100
+    Body: {"queries": [{"state", "crop", "startYear", "startMonth", "endYear", "endMonth"}, ...],
+           "series": ["price", "demand"], "format": "rows" or "columnar"}
+    Prices are model predictions as in /predict; demand uses the stored price of a month
+    when there is one, as in /predict_demand. Each model runs once for the whole request.
+    """
+    data = request.json
+    queries = data.get("queries")
+    series = data.get("series") or ["price", "demand"]
+    columnar = data.get("format") == "columnar"
 
+    if not isinstance(queries, list) or not queries or not set(series) <= {"price", "demand"}:
+        return jsonify({"error": "Expected a non-empty list of queries and series out of price, demand"}), 400
 
-def get_price_or_predict(state, crop, year, month):
     try:
-        db_month = f"{month:02d}-{year}"
+        # Check every query and count its months, checking state and crop once per query
+        results, ranges, total_months = [], [], 0
+        for query in queries:
+            if not isinstance(query, dict):
+                results.append({"state": None, "crop": None, "error": "Invalid query: expected an object"})
+                ranges.append(None)
+                continue
+            state, crop = query.get("state"), query.get("crop")
+            result = {"state": state, "crop": crop}
+            month_bounds = None
+            try:
+                if state not in le_state.classes_ or crop not in le_crop.classes_:
+                    raise ValueError(f"unseen state or crop '{state}', '{crop}'")
+                month_bounds = (query["startYear"], query["startMonth"], query["endYear"], query["endMonth"])
+                total_months += month_count(*month_bounds)
+            except (KeyError, TypeError, ValueError) as e:
+                result["error"] = f"Invalid query: {e}"
+                month_bounds = None
+            results.append(result)
+            ranges.append(month_bounds)
+
+        # Rejected before any range is expanded
+        if total_months > MAX_BULK_MONTHS:
+            return jsonify({"error": f"At most {MAX_BULK_MONTHS} months per request"}), 400
+
+        query_months = [month_range(*month_bounds) if month_bounds else [] for month_bounds in ranges]
+
+        cells = [
+            (q, result["state"], result["crop"], year, month)
+            for q, (result, months) in enumerate(zip(results, query_months))
+            for year, month in months
+        ]
+
+        # Both series in one pass over the cells of every query
+        values = forecast_cells([cell[1:] for cell in cells], series)
+
+        # Scatter the values back to their queries
+        rows = [[] for _ in results]
+        for i, (q, _, _, year, month) in enumerate(cells):
+            row = {"month": f"{calendar.month_name[month]} {year}"}
+            for name in series:
+                row[name] = values[name][i]
+            rows[q].append(row)
+
+        for result, query_rows in zip(results, rows):
+            if "error" in result:
+                continue
+            if columnar:
+                for column in ["month"] + series:
+                    result[column] = [row[column] for row in query_rows]
+            else:
+                result["series"] = query_rows
 
-        # Fetch price from database if not present then predict
-        record = fetch_price_from_db(state, crop, db_month)
+        return jsonify({"results": results})
 
-        if not record.empty:
-            return record.iloc[0]["price"]
-        else:
-            return predict_price(state, crop, db_month)
-    
     except Exception as e:
-            return jsonify({"error": str(e)}), 500
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
 
 
 @app.route('/detectDisease', methods=['POST'])
@@ -497,115 +1120,240 @@ def detect_disease():
         image_base64 = data.get("image_base64")
         lang = data.get("language")
 
-        url = f"https://generativelanguage.googleapis.com/v1/models/gemini-1.5-flash:generateContent?key={GEMINI_API_KEY}"
+        if not image_base64:
+            return jsonify({"error": "Missing required field: image_base64"}), 400
 
-        headers = {
-            "Content-Type": "application/json"
-        }
+        image_bytes = decode_image_base64(image_base64)
+        if not image_bytes:
+            return jsonify({"error": "image_base64 is not valid base64"}), 400
 
-        prompt = f"""You are an agronomist. Identify any visible crop disease and suggest an appropriate chemical or organic treatment.
-        Respond ONLY in JSON using this schema:
-        {{"disease":string, "treatment":string, "crop_name":string}}
-        Translate all values (not keys) into {lang}. If could not translate then give in English"""
-
-        payload = {
-            "contents": [
-                {
-                    "parts": [
-                        {
-                            "inline_data": {
-                                "mime_type": "image/jpeg",
-                                "data": image_base64
-                            }
-                        },
-                        {
-                            "text": prompt
-                        }
-                    ]
-                }
-            ],
-            "generationConfig": {
-                "temperature": 0.2,
-                "topK": 10,
-                "topP": 0.95,
-                "maxOutputTokens": 2048
-            }
-        }
-
-        response = requests.post(url, headers=headers, json=payload)
-        return jsonify(response.json()), response.status_code
+        gen, status_code = diagnose_image(image_bytes, image_base64, lang)
+        return jsonify(gen), status_code
 
+    except GeminiBusyError as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-@app.route('/fertCalculator', methods=['POST'])
-def fert_calculator():
+@app.route('/detectDisease/upload', methods=['POST'])
+def detect_disease_upload():
+    """Same as /detectDisease, for a photo sent as multipart/form-data (field "image") or as the raw body.
+
+    The photo is read from the request stream (spooled to disk by Werkzeug for multipart,
+    at most MAX_UPLOAD_BYTES), downscaled to DISEASE_IMAGE_MAX_SIDE pixels and re-encoded
+    before it is sent to Gemini.
+    """
+    # Werkzeug stops reading the body past this size, with or without a Content-Length.
+    # Set for this request only: the JSON routes take base64 photos, larger than uploads
+    request.max_content_length = MAX_UPLOAD_BYTES
     try:
-        data = request.get_json(force=True)
-        crop = data.get("crop", "Wheat").title()
-        area = float(data.get("area_ha", 1))
-        soil = data.get("soil_type", "loamy")
-        stage = data.get("growth_stage", "vegetative")
+        if request.content_length and request.content_length > MAX_UPLOAD_BYTES:
+            return jsonify({"error": f"Image larger than {MAX_UPLOAD_BYTES} bytes"}), 413
 
-        url = f"https://generativelanguage.googleapis.com/v1/models/gemini-1.5-flash:generateContent?key={GEMINI_API_KEY}"
+        if request.mimetype == "multipart/form-data":
+            upload = request.files.get("image")
+            stream = upload.stream if upload else None
+            lang = request.form.get("language") or request.args.get("language")
+        else:
+            # request.stream ends at max_content_length without a Content-Length (chunked
+            # uploads); reading on past it raises RequestEntityTooLarge if more was sent
+            stream = io.BytesIO(request.stream.read())
+            request.stream.read(1)
+            lang = request.args.get("language")
+
+        if stream is None:
+            return jsonify({"error": "Missing required field: image"}), 400
+
+        try:
+            image_bytes = downscale_image(stream, max_side=DISEASE_IMAGE_MAX_SIDE)
+        except (OSError, ValueError) as e:
+            return jsonify({"error": f"Could not read image: {e}"}), 400
+
+        gen, status_code = diagnose_image(image_bytes, base64.b64encode(image_bytes).decode("ascii"), lang)
+        return jsonify(gen), status_code
+
+    except RequestEntityTooLarge:
+        return jsonify({"error": f"Image larger than {MAX_UPLOAD_BYTES} bytes"}), 413
+    except GeminiBusyError as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        headers = {
-            "Content-Type": "application/json"
-        }
 
-        prompt = f"""
-            You are an agronomy assistant. 
-            Given a crop, {crop} in {area} hectare, with {soil} soil, and at {stage} stage. Suggest fertilizer requirements and example products.
-            Respond ONLY in JSON using this structure:
-            {{
-            "crop": "<crop>",
-            "area_ha": <float>,
-            "soil_type": "<soil>",
-            "growth_stage": "<stage>",
-            "fertilizer": {{
-                "N_kg": <float>,
-                "P_kg": <float>,
-                "K_kg": <float>,
-                "products": [
-                    {{"name": "Urea", "amount_kg": <float>}},
-                    {{"name": "DAP", "amount_kg": <float>}}
+def decode_image_base64(image_base64):
+    """Decodes a base64 photo, b"" if it is not valid base64."""
+    try:
+        return base64.b64decode(image_base64)
+    except binascii.Error:
+        return b""
+
+def diagnose_image(image_bytes, image_base64, lang):
+    """Asks Gemini for the disease on a JPEG photo. Returns (response json, status code).
+
+    Identical photos in the same language share one Gemini answer.
+    """
+    cache_key = disease_cache_key(image_bytes, lang)
+
+    cached = disease_cache.get(cache_key)
+    if cached is not None:
+        return cached, 200
+
+    def generate():
+        # A flight that ended between the check above and this one already cached its answer
+        cached = disease_cache.get(cache_key)
+        if cached is not None:
+            return cached, 200
+        gen, status_code = gemini.generate(disease_payload(image_base64, lang))
+        # Cached before the flight ends, so no later duplicate can miss both
+        if status_code == 200:
+            disease_cache.set(cache_key, gen)
+        return gen, status_code
+
+    # Concurrent duplicates (e.g. retries on a flaky connection) wait for the first upload's call
+    with span("gemini"):
+        return disease_flights.do(cache_key, generate)
+
+def disease_cache_key(image_bytes, lang):
+    return hashlib.sha256(image_bytes + b"\0" + str(lang).encode()).hexdigest()
+
+def disease_payload(image_base64, lang):
+    """Gemini request asking for the disease on a base64 JPEG photo, answered in lang."""
+    prompt = f"""You are an agronomist. Identify any visible crop disease and suggest an appropriate chemical or organic treatment.
+    Respond ONLY in JSON using this schema:
+    {{"disease":string, "treatment":string, "crop_name":string}}
+    Translate all values (not keys) into {lang}. If could not translate then give in English"""
+
+    payload = {
+        "contents": [
+            {
+                "parts": [
+                    {
+                        "inline_data": {
+                            "mime_type": "image/jpeg",
+                            "data": image_base64
+                        }
+                    },
+                    {
+                        "text": prompt
+                    }
                 ]
-            }},
-            "notes": "<short agronomy suggestion>"
-            }}
-            """
-
-        payload = {
-            "contents": [
-                {
-                    "parts": [
-                        {"text": prompt}
-                    ]
-                }
-            ],
-            "generationConfig": {
-                "temperature": 0.2,
-                "topK": 10,
-                "topP": 0.95,
-                "maxOutputTokens": 2048
             }
+        ],
+        "generationConfig": {
+            "temperature": 0.2,
+            "topK": 10,
+            "topP": 0.95,
+            "maxOutputTokens": 2048
         }
+    }
+    return payload
 
-        response = requests.post(url, headers=headers, json=payload)
-        gen = response.json()
-        raw_text = gen['candidates'][0]['content']['parts'][0]['text']
 
-        # Extract the JSON from inside the raw string
-        start = raw_text.find('{')
-        end = raw_text.rfind('}') + 1
-        json_text = raw_text[start:end]
+@app.route('/fertCalculator', methods=['POST'])
+def fert_calculator():
+    try:
+        data = request.get_json(force=True)
+        crop, area, soil, stage = parse_fertilizer_query(data)
 
-        return jsonify(json.loads(json_text)), 200
+        # Recommendations are cached per hectare and scaled to the requested area locally
+        cache_key = json.dumps([crop, soil, stage])
+        per_hectare = fert_cache.get(cache_key)
+        if per_hectare is None:
+            per_hectare = fetch_fertilizer_per_hectare(crop, soil, stage)
+            fert_cache.set(cache_key, per_hectare)
 
+        return jsonify(scale_fertilizer(per_hectare, area)), 200
+
+    except GeminiBusyError as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def parse_fertilizer_query(data):
+    """(crop, area, soil, stage) of a /fertCalculator body, with crop, soil and stage normalized."""
+    crop = " ".join(str(data.get("crop", "Wheat")).split()).title()
+    area = float(data.get("area_ha", 1))
+    soil = " ".join(str(data.get("soil_type", "loamy")).lower().split())
+    stage = " ".join(str(data.get("growth_stage", "vegetative")).lower().split())
+    return crop, area, soil, stage
+
+def fetch_fertilizer_per_hectare(crop, soil, stage):
+    """Asks Gemini for the fertilizer recommendation of one hectare."""
+    payload = fertilizer_payload(crop, soil, stage)
+    with span("gemini"):
+        gen, _ = gemini.generate(payload)
+    return parse_fertilizer_answer(gen)
+
+def fertilizer_payload(crop, soil, stage):
+    """Gemini request asking for the fertilizer recommendation of one hectare."""
+    prompt = f"""
+        You are an agronomy assistant. 
+        Given a crop, {crop} in 1.0 hectare, with {soil} soil, and at {stage} stage. Suggest fertilizer requirements and example products.
+        Respond ONLY in JSON using this structure:
+        {{
+        "crop": "<crop>",
+        "area_ha": <float>,
+        "soil_type": "<soil>",
+        "growth_stage": "<stage>",
+        "fertilizer": {{
+            "N_kg": <float>,
+            "P_kg": <float>,
+            "K_kg": <float>,
+            "products": [
+                {{"name": "Urea", "amount_kg": <float>}},
+                {{"name": "DAP", "amount_kg": <float>}}
+            ]
+        }},
+        "notes": "<short agronomy suggestion>"
+        }}
+        """
+
+    payload = {
+        "contents": [
+            {
+                "parts": [
+                    {"text": prompt}
+                ]
+            }
+        ],
+        "generationConfig": {
+            "temperature": 0.2,
+            "topK": 10,
+            "topP": 0.95,
+            "maxOutputTokens": 2048
+        }
+    }
+    return payload
+
+def parse_fertilizer_answer(gen):
+    """Recommendation dict from the JSON in a Gemini answer."""
+    raw_text = gen['candidates'][0]['content']['parts'][0]['text']
+
+    # Extract the JSON from inside the raw string
+    start = raw_text.find('{')
+    end = raw_text.rfind('}') + 1
+    json_text = raw_text[start:end]
+
+    return json.loads(json_text)
+
+def scale_fertilizer(per_hectare, area):
+    """Scales a one-hectare fertilizer recommendation to area hectares."""
+    def scale(value):
+        return round(value * area, 2) if isinstance(value, (int, float)) else value
+
+    recommendation = dict(per_hectare, area_ha=area)
+    fertilizer = dict(per_hectare.get("fertilizer") or {})
+    for nutrient in ("N_kg", "P_kg", "K_kg"):
+        if nutrient in fertilizer:
+            fertilizer[nutrient] = scale(fertilizer[nutrient])
+    fertilizer["products"] = [
+        dict(product, amount_kg=scale(product.get("amount_kg")))
+        for product in fertilizer.get("products", [])
+    ]
+    recommendation["fertilizer"] = fertilizer
+    return recommendation
+
 
 if __name__ == "__main__":
     import os
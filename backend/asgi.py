@@ -0,0 +1,377 @@
+"""
+Async serving mode: uvicorn asgi:app --host 0.0.0.0 --port 8080
+
+The routes that wait on Firestore or Gemini are served natively on the event loop:
+their reads and calls are awaited, so a slow Gemini answer only holds a coroutine,
+and /cropsCollection issues the reads of all its crops at once. CPU-bound work runs
+on a bounded inference pool. Identical concurrent /cropsCollection, /pastPrices and
+/pastDemand requests share one computation. Every other route is served by the Flask
+app of app.py on a thread pool, and all routes keep the contracts of app.py.
+"""
+import asyncio
+import base64
+import contextlib
+import contextvars
+import functools
+import io
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from a2wsgi import WSGIMiddleware
+from firebase_admin import firestore_async
+from starlette.applications import Starlette
+from starlette.formparsers import MultiPartParser
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+
+import app as backend
+from gemini import GeminiBusyError
+from singleflight import AsyncSingleFlight
+
+# Forest inference and feature building run here, at most INFERENCE_WORKERS at a time
+inference_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("INFERENCE_WORKERS", 2)), thread_name_prefix="inference"
+)
+
+# Threads serving the routes delegated to the Flask app
+WSGI_WORKERS = int(os.getenv("WSGI_WORKERS", 8))
+
+disease_flights = AsyncSingleFlight()
+backend.singleflights["disease_async"] = disease_flights
+
+# Async Firestore client, created on startup on the server's event loop
+async_db = None
+
+
+async def run_inference(fn, *args):
+    """Runs fn(*args) on the inference pool, in the context of the calling request."""
+    context = contextvars.copy_context()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(inference_pool, functools.partial(context.run, fn, *args))
+
+
+def json_response(obj, status_code=200):
+    """JSON response with the body Flask's jsonify gives."""
+    with backend.span("serialize"):
+        body = backend.app.json.dumps(obj, separators=(",", ":")) + "\n"
+    return Response(body, status_code=status_code, media_type="application/json")
+
+
+def native_route(path, handler):
+    """Route served on the event loop, recorded in the request metrics like the Flask routes."""
+    async def endpoint(request):
+        token = backend.current_asgi_route.set(path)
+        start = time.perf_counter()
+        status_code = 500
+        try:
+            response = await handler(request)
+            status_code = response.status_code
+            return response
+        finally:
+            backend.request_seconds.observe(
+                time.perf_counter() - start, route=path, method=request.method, status=status_code
+            )
+            backend.current_asgi_route.reset(token)
+
+    return Route(path, endpoint, methods=["POST"])
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+async def limited_stream(request, limit):
+    """The chunks of the request body, raising UploadTooLarge once more than limit bytes arrived."""
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise UploadTooLarge(limit)
+        yield chunk
+
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+def coalesced(handler):
+    """Route handler whose identical concurrent requests share one computed response.
+
+    Requests are identical when they have the same path, JSON body, model version and
+    crop_data version; the first one runs handler and the others await its response.
+    Coalesced requests are counted in backend.singleflights["<handler>_async"].
+    """
+    flights = backend.singleflights[f"{handler.__name__}_async"] = AsyncSingleFlight()
+
+    @functools.wraps(handler)
+    async def endpoint(request):
+        data = await read_json(request)
+        key = (request.url.path, json.dumps(data, sort_keys=True), backend.model_version, backend.data_version())
+        response = await flights.do(key, lambda: handler(request))
+        # A response object is sent once, each request gets its own copy
+        return Response(response.body, status_code=response.status_code, media_type=response.media_type)
+
+    return endpoint
+
+
+async def fetch_month_docs(state, cells):
+    """Async fetch_month_docs: the batched reads of all cache misses are awaited together."""
+    if backend.replica_ready():
+        return backend.replica.get(state, cells)
+
+    docs, doc_refs = {}, {}
+    state_doc_ref = async_db.collection('crop_data').document(state)
+    for crop, db_month in cells:
+        month_data = backend.doc_cache.get((state, crop, db_month))
+        if month_data is backend.MISSING:
+            month_doc_ref = state_doc_ref.collection(crop).document(db_month)
+            doc_refs[month_doc_ref.path] = (month_doc_ref, (crop, db_month))
+        else:
+            docs[(crop, db_month)] = month_data
+
+    async def get_all(chunk):
+        return [snapshot async for snapshot in async_db.get_all(chunk)]
+
+    pending = [month_doc_ref for month_doc_ref, _ in doc_refs.values()]
+    with backend.span("firestore"):
+        chunks = await asyncio.gather(*(
+            get_all(pending[start:start + backend.FIRESTORE_BATCH_SIZE])
+            for start in range(0, len(pending), backend.FIRESTORE_BATCH_SIZE)
+        ))
+    for snapshot in itertools.chain.from_iterable(chunks):
+        crop, db_month = doc_refs[snapshot.reference.path][1]
+        docs[(crop, db_month)] = snapshot.to_dict() if snapshot.exists else None
+
+    backend.cache_fetched_docs(state, {cell: docs.get(cell) for _, cell in doc_refs.values()})
+
+    for cell in cells:
+        docs.setdefault(cell, None)
+    return docs
+
+
+async def read_month_docs(state, cells):
+    """Async read_month_docs: read errors count as missing documents."""
+    try:
+        return await fetch_month_docs(state, cells)
+    except Exception as e:
+        print(f"Error fetching from database: {e}")
+        return {cell: None for cell in cells}
+
+
+@coalesced
+async def crops_collection(request):
+    data = await read_json(request) or {}
+    selected_state = data.get("selectedState")
+    previous_month = data.get("previousMonth")
+    next_month = data.get("nextMonth")
+
+    if not selected_state or not previous_month or not next_month:
+        return json_response({"error": "Missing required fields: selectedState, previousMonth, nextMonth"}, 400)
+
+    try:
+        # All crops of the state, then the previous and next month documents of every crop at once
+        if backend.replica_ready():
+            crop_names = backend.replica.crops(selected_state)
+        else:
+            state_doc_ref = async_db.collection('crop_data').document(selected_state)
+            with backend.span("firestore"):
+                crop_names = [crop_collection.id async for crop_collection in state_doc_ref.collections()]
+
+        cells = [(crop_name, month) for crop_name in crop_names for month in (previous_month, next_month)]
+        docs = await fetch_month_docs(selected_state, cells)
+
+        crops = await run_inference(
+            backend.crops_from_docs, selected_state, crop_names, previous_month, next_month, docs
+        )
+        return json_response({"crops": crops})
+
+    except Exception as e:
+        return json_response({"error": str(e)}, 500)
+
+
+async def past_months_request(request):
+    """(state, crop, year, month) of a /pastPrices or /pastDemand body, None if a field is missing."""
+    data = await read_json(request) or {}
+    state, crop = data.get("state"), data.get("crop")
+    year, month = backend.year_month(data)
+    if not state or not crop or not year or not month:
+        return None
+    return state, crop, year, month
+
+
+def past_month_cells(crop, year, month):
+    """(months, cells) of the months a /pastPrices or /pastDemand request reads; raises for an invalid month."""
+    months = backend.previous_months(year, month)
+    cells = [(crop, f"{past_month:02d}-{past_year}") for past_year, past_month in months]
+    return months, cells
+
+
+@coalesced
+async def get_past_prices(request):
+    query = await past_months_request(request)
+    if query is None:
+        return json_response({"error": "Missing required fields"}, 400)
+
+    try:
+        state, crop, year, month = query
+        months, cells = past_month_cells(crop, year, month)
+        docs = await read_month_docs(state, cells)
+        return json_response(await run_inference(backend.past_prices_from_docs, state, months, cells, docs))
+    except Exception as e:
+        return json_response({"error": str(e)}, 500)
+
+
+@coalesced
+async def get_past_demand(request):
+    query = await past_months_request(request)
+    if query is None:
+        return json_response({"error": "Missing required fields"}, 400)
+
+    try:
+        state, crop, year, month = query
+        months, cells = past_month_cells(crop, year, month)
+        docs = await read_month_docs(state, cells)
+        return json_response(await run_inference(backend.past_demand_from_docs, state, months, cells, docs))
+    except Exception as e:
+        return json_response({"error": str(e)}, 500)
+
+
+async def diagnose_image(image_bytes, image_base64, lang):
+    """Async diagnose_image: identical concurrent photos share one awaited Gemini call."""
+    cache_key = await asyncio.to_thread(backend.disease_cache_key, image_bytes, lang)
+
+    cached = backend.disease_cache.get(cache_key)
+    if cached is not None:
+        return cached, 200
+
+    async def generate():
+        # Checked and written inside the flight, like diagnose_image in app.py
+        cached = backend.disease_cache.get(cache_key)
+        if cached is not None:
+            return cached, 200
+        gen, status_code = await backend.gemini.generate_async(backend.disease_payload(image_base64, lang))
+        if status_code == 200:
+            backend.disease_cache.set(cache_key, gen)
+        return gen, status_code
+
+    with backend.span("gemini"):
+        return await disease_flights.do(cache_key, generate)
+
+
+async def detect_disease(request):
+    try:
+        data = await read_json(request) or {}
+        image_base64 = data.get("image_base64")
+        lang = data.get("language")
+
+        if not image_base64:
+            return json_response({"error": "Missing required field: image_base64"}, 400)
+
+        image_bytes = await asyncio.to_thread(backend.decode_image_base64, image_base64)
+        if not image_bytes:
+            return json_response({"error": "image_base64 is not valid base64"}, 400)
+
+        gen, status_code = await diagnose_image(image_bytes, image_base64, lang)
+        return json_response(gen, status_code)
+
+    except GeminiBusyError as e:
+        return json_response({"error": str(e)}, 503)
+    except Exception as e:
+        return json_response({"error": str(e)}, 500)
+
+
+async def detect_disease_upload(request):
+    try:
+        content_length = int(request.headers.get("content-length") or 0)
+        if content_length > backend.MAX_UPLOAD_BYTES:
+            return json_response({"error": f"Image larger than {backend.MAX_UPLOAD_BYTES} bytes"}, 413)
+
+        # The body is read through limited_stream, so chunked uploads are capped too
+        form = None
+        try:
+            body = limited_stream(request, backend.MAX_UPLOAD_BYTES)
+            if request.headers.get("content-type", "").split(";")[0].strip() == "multipart/form-data":
+                form = await MultiPartParser(request.headers, body).parse()
+                upload = form.get("image")
+                stream = upload.file if hasattr(upload, "file") else None
+                lang = form.get("language") or request.query_params.get("language")
+            else:
+                stream = io.BytesIO(b"".join([chunk async for chunk in body]))
+                lang = request.query_params.get("language")
+
+            if stream is None:
+                return json_response({"error": "Missing required field: image"}, 400)
+
+            try:
+                image_bytes = await asyncio.to_thread(
+                    backend.downscale_image, stream, max_side=backend.DISEASE_IMAGE_MAX_SIDE
+                )
+            except (OSError, ValueError) as e:
+                return json_response({"error": f"Could not read image: {e}"}, 400)
+        finally:
+            if form is not None:
+                await form.close()
+
+        image_base64 = base64.b64encode(image_bytes).decode("ascii")
+        gen, status_code = await diagnose_image(image_bytes, image_base64, lang)
+        return json_response(gen, status_code)
+
+    except UploadTooLarge:
+        return json_response({"error": f"Image larger than {backend.MAX_UPLOAD_BYTES} bytes"}, 413)
+    except GeminiBusyError as e:
+        return json_response({"error": str(e)}, 503)
+    except Exception as e:
+        return json_response({"error": str(e)}, 500)
+
+
+async def fert_calculator(request):
+    try:
+        data = json.loads(await request.body())
+        crop, area, soil, stage = backend.parse_fertilizer_query(data)
+
+        # Recommendations are cached per hectare and scaled to the requested area locally
+        cache_key = json.dumps([crop, soil, stage])
+        per_hectare = backend.fert_cache.get(cache_key)
+        if per_hectare is None:
+            payload = backend.fertilizer_payload(crop, soil, stage)
+            with backend.span("gemini"):
+                gen, _ = await backend.gemini.generate_async(payload)
+            per_hectare = backend.parse_fertilizer_answer(gen)
+            backend.fert_cache.set(cache_key, per_hectare)
+
+        return json_response(backend.scale_fertilizer(per_hectare, area), 200)
+
+    except GeminiBusyError as e:
+        return json_response({"error": str(e)}, 503)
+    except Exception as e:
+        return json_response({"error": str(e)}, 500)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_):
+    global async_db
+    async_db = firestore_async.client()
+    yield
+
+
+app = Starlette(
+    routes=[
+        native_route("/cropsCollection", crops_collection),
+        native_route("/pastPrices", get_past_prices),
+        native_route("/pastDemand", get_past_demand),
+        native_route("/detectDisease", detect_disease),
+        native_route("/detectDisease/upload", detect_disease_upload),
+        native_route("/fertCalculator", fert_calculator),
+        Mount("/", WSGIMiddleware(backend.app, workers=WSGI_WORKERS))
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    lifespan=lifespan
+)
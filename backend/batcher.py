@@ -0,0 +1,78 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Runs a model's predict on rows queued by many threads, one call per batch.
+
+    predict(X) queues the rows and waits for them. Worker threads take the oldest
+    request, keep collecting requests for up to window_seconds or until max_rows rows
+    are queued, stack the rows, call predict_fn once and hand every caller its slice
+    of the result. An exception of predict_fn is raised in every caller of the batch.
+    """
+
+    def __init__(self, predict_fn, window_seconds=0.002, max_rows=256, workers=1, name="model"):
+        self.predict_fn = predict_fn
+        self.window_seconds = window_seconds
+        self.max_rows = max_rows
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        for i in range(workers):
+            threading.Thread(target=self._run, name=f"batcher-{name}-{i}", daemon=True).start()
+
+    def submit(self, X):
+        """Queues the rows of X and returns a Future of their predictions."""
+        future = Future()
+        self._queue.put((np.asarray(X), future))
+        return future
+
+    def predict(self, X):
+        return self.submit(X).result()
+
+    def _collect(self):
+        requests = [self._queue.get()]
+        n_rows = len(requests[0][0])
+        deadline = time.monotonic() + self.window_seconds
+        while n_rows < self.max_rows:
+            timeout = deadline - time.monotonic()
+            try:
+                request = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            requests.append(request)
+            n_rows += len(request[0])
+        return requests, n_rows
+
+    def _run(self):
+        while True:
+            requests, n_rows = self._collect()
+            try:
+                X = requests[0][0] if len(requests) == 1 else np.concatenate([rows for rows, _ in requests])
+                predictions = self.predict_fn(X)
+            except BaseException as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+
+            with self._lock:
+                self.batches += 1
+                self.rows += n_rows
+            start = 0
+            for rows, future in requests:
+                future.set_result(predictions[start:start + len(rows)])
+                start += len(rows)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "rows": self.rows,
+                "queued": self._queue.qsize(),
+                "rows_per_batch": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            }
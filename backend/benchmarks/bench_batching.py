@@ -0,0 +1,82 @@
+"""
+Throughput/latency benchmark of micro-batched inference (batcher.py).
+
+--clients threads each predict one row at a time in a closed loop for --duration
+seconds, either calling the forest directly or through a MicroBatcher with each of
+the --windows batch windows. Reports rows/s, per-call latency and rows per batch.
+Run from the backend/ folder (uses the flat export when present, else the .pkl):
+    python benchmarks/bench_batching.py --clients 32 --windows 0.5,2,5
+"""
+import argparse
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, ".")
+from batcher import MicroBatcher
+from flat_forest import load_forest
+
+
+def make_rows(n_rows, n_features):
+    # Encoded labels, year and month, then continuous features
+    rows = np.random.uniform(0, 1, (n_rows, n_features))
+    rows[:, 0] = np.random.randint(0, 18, n_rows)
+    rows[:, 1] = np.random.randint(0, 30, n_rows)
+    rows[:, 2] = np.random.randint(2022, 2030, n_rows)
+    rows[:, 3] = np.random.randint(1, 13, n_rows)
+    return rows
+
+
+def run(predict, rows, clients, duration):
+    """Closed loop of single-row predictions; returns (rows/s, latencies in ms)."""
+    latencies = [[] for _ in range(clients)]
+    stop = time.perf_counter() + duration
+
+    def client(i):
+        rng = np.random.default_rng(i)
+        while time.perf_counter() < stop:
+            row = rows[rng.integers(len(rows))][None, :]
+            start = time.perf_counter()
+            predict(row)
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    all_latencies = np.concatenate([np.array(l) for l in latencies]) * 1000
+    return len(all_latencies) / duration, all_latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="price_model")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--windows", default="0.5,2,5", help="batch windows in ms")
+    parser.add_argument("--max-rows", type=int, default=256)
+    args = parser.parse_args()
+
+    forest = load_forest(args.model)
+    rows = make_rows(1000, forest.n_features_in_ if hasattr(forest, "n_features_in_") else 8)
+    forest.predict(rows[:1])  # warm up
+
+    print(f"{args.model}, {args.clients} clients, single-row calls, {args.duration:g} s per variant")
+    print(f"{'variant':>12} | {'rows/s':>8} | {'p50 (ms)':>8} | {'p99 (ms)':>8} | {'rows/batch':>10}")
+    throughput, latencies = run(forest.predict, rows, args.clients, args.duration)
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(f"{'direct':>12} | {throughput:>8.0f} | {p50:>8.2f} | {p99:>8.2f} | {1:>10.1f}")
+
+    for window in [float(w) for w in args.windows.split(",")]:
+        batcher = MicroBatcher(forest.predict, window / 1000, args.max_rows)
+        throughput, latencies = run(batcher.predict, rows, args.clients, args.duration)
+        p50, p99 = np.percentile(latencies, [50, 99])
+        print(f"{f'{window:g} ms':>12} | {throughput:>8.0f} | {p50:>8.2f} | {p99:>8.2f} | "
+              f"{batcher.stats()['rows_per_batch']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Micro-benchmark for the demand model input: DataFrame + scaler.transform + reindex
+(the previous build_demand_features) vs the NumPy DemandFeatureAssembler.
+
+Both paths get the same market features, so the timings cover only the assembly.
+The assembled inputs and the predictions are checked to be bit-identical first.
+Run from the backend/ folder (needs demand_model.pkl, scalers.pkl, label_encoder.pkl):
+    python benchmarks/bench_demand_features.py --repeat 50
+"""
+import argparse
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, ".")
+from features import DemandFeatureAssembler, RandomFeatureProvider
+
+ROW_COUNTS = [1, 12, 60, 240]
+
+
+def make_keys(n_rows, label_encoders):
+    states, crops = label_encoders["state"].classes_, label_encoders["crop"].classes_
+    return [
+        ("demand", states[i % len(states)], crops[i % len(crops)], 2024 + i // 12, i % 12 + 1,
+         round(np.random.uniform(1000, 9000), 2))
+        for i in range(n_rows)
+    ]
+
+
+def dataframe_path(keys, market, model, scaler, label_encoders):
+    # The previous build_demand_features() in app.py
+    numerical_cols = ["price", "marketing_spend", "competitor_price", "supply"]
+
+    def safe_encode(label_encoder, value):
+        return label_encoder.transform([value])[0] if value in label_encoder.classes_ else 0
+
+    input_data = []
+    for _, state, crop, year, month, price in keys:
+        additional_features = market(state, crop, month, year)
+        input_data.append({
+            "state": safe_encode(label_encoders["state"], state),
+            "crop": safe_encode(label_encoders["crop"], crop),
+            "year": year,
+            "month": month,
+            "seasonality": additional_features["seasonality"],
+            "special_event": additional_features["special_event"],
+            "price": price,
+            "marketing_spend": additional_features["marketing_spend"],
+            "competitor_price": additional_features["competitor_price"],
+            "supply": additional_features["supply"]
+        })
+    input_df = pd.DataFrame(input_data)
+    input_df[numerical_cols] = scaler.transform(input_df[numerical_cols])
+    return input_df.reindex(columns=model.feature_names_in_)
+
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="demand_model.pkl")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+    scaler = joblib.load("scalers.pkl")
+    label_encoders = joblib.load("label_encoder.pkl")
+
+    # Fixed market features per key, shared by both paths
+    provider = RandomFeatureProvider()
+    market_rows = {}
+
+    def market(state, crop, month, year):
+        return market_rows.setdefault((state, crop, month, year), provider.market(state, crop, month, year))
+
+    assembler = DemandFeatureAssembler(model.feature_names_in_, scaler, label_encoders, market)
+
+    print(f"{'rows':>5} | {'DataFrame (ms)':>14} | {'NumPy (ms)':>10} | {'speedup':>7} | {'+ predict (ms)':>15}")
+    for n_rows in ROW_COUNTS:
+        keys = make_keys(n_rows, label_encoders)
+        expected = dataframe_path(keys, market, model, scaler, label_encoders)
+        assembled = assembler.build(keys)
+        assert np.array_equal(expected.to_numpy(dtype=float), assembled)
+        assert np.array_equal(model.predict(expected), model.predict(assembled))
+
+        frame_ms = timeit(lambda: dataframe_path(keys, market, model, scaler, label_encoders), args.repeat)
+        numpy_ms = timeit(lambda: assembler.build(keys), args.repeat)
+        predict_ms = timeit(lambda: model.predict(assembler.build(keys)), args.repeat)
+        print(f"{n_rows:>5} | {frame_ms:>14.3f} | {numpy_ms:>10.3f} | {frame_ms / numpy_ms:>6.1f}x | {predict_ms:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Micro-benchmark for /predict: one model call per month vs one batched call per range.
+
+Run from the backend/ folder (needs price_model.pkl):
+    python benchmarks/bench_predict.py --repeat 20
+"""
+import argparse
+import time
+
+import joblib
+import numpy as np
+
+RANGE_LENGTHS = [1, 12, 60, 120]
+
+
+def make_rows(n_months):
+    # Same feature layout as build_price_features() in app.py
+    rows = np.empty((n_months, 8))
+    for i in range(n_months):
+        year, month = 2024 + i // 12, i % 12 + 1
+        rows[i] = [
+            0, 0, year, month,
+            np.random.uniform(20, 45),
+            np.random.uniform(0, 300),
+            np.random.uniform(0.1, 0.5),
+            np.random.uniform(0.2, 0.7)
+        ]
+    return rows
+
+
+def per_month(model, rows):
+    return [model.predict(row.reshape(1, -1))[0] for row in rows]
+
+
+def batched(model, rows):
+    return list(model.predict(rows))
+
+
+def timeit(fn, model, rows, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(model, rows)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="price_model.pkl")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    model = joblib.load(args.model)
+
+    print(f"{'months':>6} | {'per-month (ms)':>14} | {'batched (ms)':>12} | {'speedup':>7}")
+    for n_months in RANGE_LENGTHS:
+        rows = make_rows(n_months)
+        assert np.allclose(per_month(model, rows), batched(model, rows))
+
+        loop_ms = timeit(per_month, model, rows, args.repeat)
+        batch_ms = timeit(batched, model, rows, args.repeat)
+        print(f"{n_months:>6} | {loop_ms:>14.2f} | {batch_ms:>12.2f} | {loop_ms / batch_ms:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
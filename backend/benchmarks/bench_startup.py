@@ -0,0 +1,60 @@
+"""
+Startup benchmark: time and memory to load the models as pickles vs. their flat export.
+
+Each variant runs in a fresh interpreter and reports the load time, the latency of the
+first prediction and the resident set size afterwards. Run from the backend/ folder
+(needs the .pkl files and the *.flat.* files from model_training/export_flat_models.py):
+    python benchmarks/bench_startup.py
+"""
+import json
+import subprocess
+import sys
+
+CHILD = r"""
+import json, time, warnings
+import numpy as np
+warnings.filterwarnings("ignore")
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+variant = {variant!r}
+start = time.perf_counter()
+if variant == "pickle":
+    import joblib
+    models = [joblib.load("price_model.pkl"), joblib.load("demand_model.pkl")]
+else:
+    from flat_forest import FlatForest
+    models = [FlatForest("price_model"), FlatForest("demand_model")]
+load_s = time.perf_counter() - start
+
+start = time.perf_counter()
+for m in models:
+    m.predict(np.zeros((1, m.n_features_in_)))
+predict_s = time.perf_counter() - start
+
+print(json.dumps({{"load_ms": load_s * 1000, "first_predict_ms": predict_s * 1000, "rss_mb": rss_mb()}}))
+"""
+
+
+def run(variant):
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD.format(variant=variant)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    print(f"{'variant':>8} | {'load (ms)':>10} | {'1st predict (ms)':>16} | {'RSS (MB)':>8}")
+    for variant in ("pickle", "flat"):
+        result = run(variant)
+        print(f"{variant:>8} | {result['load_ms']:>10.1f} | {result['first_predict_ms']:>16.1f} | {result['rss_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Upload benchmark for /detectDisease: base64-in-JSON body vs. streamed upload + downscaling.
+
+Both variants do the server-side work up to the serialized Gemini request body:
+  json    parse the JSON body, build the payload around the base64 string, serialize it
+  upload  read the photo from a file stream, downscale/re-encode it, base64 it, serialize
+
+Each variant runs in a fresh interpreter on the same synthetic photo; peak memory is the
+growth of the peak RSS (VmHWM) over the RSS before the request. Run from the backend/ folder:
+    python benchmarks/bench_upload.py --megapixels 12
+"""
+import argparse
+import base64
+import json
+import subprocess
+import sys
+
+import numpy as np
+from PIL import Image
+
+PHOTO_PATH = "/tmp/bench_upload.jpg"
+BODY_PATH = "/tmp/bench_upload.json"
+
+CHILD = r"""
+import base64, json, sys, time
+sys.path.insert(0, ".")
+from images import downscale_image
+
+def proc_kb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1])
+
+# The JSON variant gets its request body in memory, as Flask buffers it
+body = open("{body_path}", "rb").read() if "{variant}" == "json" else None
+
+baseline = proc_kb("VmRSS:")
+start = time.perf_counter()
+if "{variant}" == "json":
+    data = json.loads(body)
+    image_base64 = data["image_base64"]
+else:
+    with open("{photo_path}", "rb") as stream:
+        image_base64 = base64.b64encode(downscale_image(stream)).decode()
+payload = {{"contents": [{{"parts": [{{"inline_data": {{"mime_type": "image/jpeg", "data": image_base64}}}}]}}]}}
+request_body = json.dumps(payload).encode()
+elapsed = time.perf_counter() - start
+
+print(json.dumps({{
+    "latency_ms": elapsed * 1000,
+    "peak_mb": (proc_kb("VmHWM:") - baseline) / 1024,
+    "upstream_kb": len(request_body) / 1024
+}}))
+"""
+
+
+def make_photo(megapixels):
+    """Writes a synthetic camera photo (gradient plus sensor noise) and its JSON request body."""
+    height = int((megapixels * 1e6 * 3 / 4) ** 0.5)
+    width = height * 4 // 3
+    y, x = np.mgrid[0:height, 0:width]
+    pixels = np.stack([x * 255 // width, y * 255 // height, (x + y) * 255 // (width + height)], axis=-1)
+    pixels = (pixels + np.random.randint(0, 24, pixels.shape)).clip(0, 255).astype("uint8")
+    Image.fromarray(pixels).save(PHOTO_PATH, "JPEG", quality=92)
+
+    with open(PHOTO_PATH, "rb") as f:
+        photo = f.read()
+    with open(BODY_PATH, "w") as f:
+        json.dump({"image_base64": base64.b64encode(photo).decode(), "language": "Hindi"}, f)
+    return len(photo)
+
+
+def run(variant):
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD.format(variant=variant, photo_path=PHOTO_PATH, body_path=BODY_PATH)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, default=12)
+    args = parser.parse_args()
+
+    photo_bytes = make_photo(args.megapixels)
+    print(f"{args.megapixels:g} MP photo, {photo_bytes / 1024:.0f} KB JPEG")
+    print(f"{'variant':>7} | {'latency (ms)':>12} | {'peak (MB)':>9} | {'to Gemini (KB)':>14}")
+    for variant in ("json", "upload"):
+        r = run(variant)
+        print(f"{variant:>7} | {r['latency_ms']:>12.1f} | {r['peak_mb']:>9.1f} | {r['upstream_kb']:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
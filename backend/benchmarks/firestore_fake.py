@@ -0,0 +1,215 @@
+"""
+In-memory stand-in for the Firestore client, covering what app.py, asgi.py and
+model_training/publish_firestore.py use: collection/document references, collections(),
+list_documents(), get(), get_all(), batch() and on_snapshot(), plus the async client's
+collections() and get_all().
+
+Every call that would be a round trip sleeps for a configurable latency. install()
+patches firebase_admin so that importing app.py picks up the fake instead of
+connecting to Firebase; seed_from_csv() fills crop_data/<state>/<crop>/<MM-YYYY>
+with the monthly averages of the training CSVs.
+"""
+import asyncio
+import threading
+import time
+
+import pandas as pd
+
+
+class _Snapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return self._data.get(field)
+
+
+class _Change:
+    class type:
+        name = "ADDED"
+
+    def __init__(self, document):
+        self.document = document
+
+
+class _Watch:
+    is_active = True
+
+    def unsubscribe(self):
+        self.is_active = False
+
+
+class WriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference, data, merge=False):
+        self._writes.append((reference._path, data, merge))
+
+    def commit(self):
+        self._client._round_trip()
+        self._client.commits += 1
+        for path, data, merge in self._writes:
+            current = self._client.documents.get(path) if merge else None
+            self._client.documents[path] = {**(current or {}), **data}
+
+
+class DocumentReference:
+    def __init__(self, client, path):
+        self._client = client
+        self._path = path
+        self.id = path[-1]
+        self.path = "/".join(path)
+
+    def collection(self, name):
+        return CollectionReference(self._client, self._path + (name,))
+
+    def collections(self):
+        self._client._round_trip()
+        return [self.collection(name) for name in self._collection_names()]
+
+    def _collection_names(self):
+        depth = len(self._path)
+        return sorted({
+            path[depth] for path in self._client.documents
+            if len(path) > depth + 1 and path[:depth] == self._path
+        })
+
+    def get(self):
+        self._client._round_trip()
+        return _Snapshot(self, self._client.documents.get(self._path))
+
+    def set(self, data, merge=False):
+        self._client._round_trip()
+        current = self._client.documents.get(self._path) if merge else None
+        self._client.documents[self._path] = {**(current or {}), **data}
+
+
+class CollectionReference:
+    def __init__(self, client, path):
+        self._client = client
+        self._path = path
+        self.id = path[-1]
+
+    def document(self, document_id):
+        return DocumentReference(self._client, self._path + (document_id,))
+
+    def list_documents(self):
+        # Like Firestore, this includes documents that only hold subcollections
+        self._client._round_trip()
+        depth = len(self._path)
+        return [self.document(document_id) for document_id in sorted({
+            path[depth] for path in self._client.documents if len(path) > depth and path[:depth] == self._path
+        })]
+
+    def stream(self):
+        self._client._round_trip()
+        return [
+            _Snapshot(DocumentReference(self._client, path), data)
+            for path, data in list(self._client.documents.items()) if path[:-1] == self._path
+        ]
+
+    def on_snapshot(self, callback):
+        # Like the real listener, the initial snapshot arrives on a background thread.
+        # It is pushed on the listener's stream, so it doesn't count as a round trip.
+        def deliver():
+            snapshots = [
+                _Snapshot(DocumentReference(self._client, path), data)
+                for path, data in list(self._client.documents.items()) if path[:-1] == self._path
+            ]
+            callback(snapshots, [_Change(snapshot) for snapshot in snapshots], None)
+
+        threading.Thread(target=deliver, daemon=True).start()
+        return _Watch()
+
+
+class AsyncDocumentReference(DocumentReference):
+    def collection(self, name):
+        return AsyncCollectionReference(self._client, self._path + (name,))
+
+    async def collections(self):
+        await self._client._async_round_trip()
+        for name in self._collection_names():
+            yield self.collection(name)
+
+
+class AsyncCollectionReference(CollectionReference):
+    def document(self, document_id):
+        return AsyncDocumentReference(self._client, self._path + (document_id,))
+
+
+class AsyncFakeFirestore:
+    """Async client view of a FakeFirestore, sharing its documents."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def collection(self, name):
+        return AsyncCollectionReference(self._client, (name,))
+
+    async def get_all(self, references, field_paths=None):
+        await self._client._async_round_trip()
+        for reference in references:
+            yield _Snapshot(reference, self._client.documents.get(reference._path))
+
+
+class FakeFirestore:
+    """Documents keyed by their path tuple, e.g. ("crop_data", "Bihar", "Wheat", "01-2023")."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.documents = {}
+        self.round_trips = 0
+        self.commits = 0
+        self._lock = threading.Lock()
+
+    def _round_trip(self):
+        with self._lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    async def _async_round_trip(self):
+        with self._lock:
+            self.round_trips += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def collection(self, name):
+        return CollectionReference(self, (name,))
+
+    def get_all(self, references, field_paths=None):
+        self._round_trip()
+        return [_Snapshot(reference, self.documents.get(reference._path)) for reference in references]
+
+    def batch(self):
+        return WriteBatch(self)
+
+
+def seed_from_csv(client, prices_csv, demand_csv):
+    """Writes the monthly mean price and demand of every (state, crop, month) of the CSVs."""
+    for csv, field in ((prices_csv, "price"), (demand_csv, "demand")):
+        df = pd.read_csv(csv)
+        df["month"] = pd.to_datetime(df["date"]).dt.strftime("%m-%Y")
+        for (state, crop, month), value in df.groupby(["state", "crop", "month"])[field].mean().items():
+            path = ("crop_data", state, crop, month)
+            client.documents[path] = {**client.documents.get(path, {}), field: round(float(value), 2)}
+    return client
+
+
+def install(client):
+    """Makes firebase_admin hand out client instead of connecting (call before importing app)."""
+    import firebase_admin
+    from firebase_admin import credentials, firestore, firestore_async
+
+    credentials.Certificate = lambda path: None
+    firebase_admin.initialize_app = lambda credential=None, *args, **kwargs: None
+    firestore.client = lambda *args, **kwargs: client
+    firestore_async.client = lambda *args, **kwargs: AsyncFakeFirestore(client)
@@ -0,0 +1,94 @@
+"""
+Local stand-in for the Gemini generateContent endpoint.
+
+Answers every POST /v1/models/<model>:generateContent with a canned candidate after a
+configurable delay, and can fail a fraction of calls (or the next fail_next calls) with
+503 to exercise retries.
+Point the backend at it with GEMINI_BASE_URL:
+    python benchmarks/gemini_stub.py --port 8081 --delay 2.0
+    GEMINI_BASE_URL=http://127.0.0.1:8081 flask run
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DISEASE_ANSWER = {"disease": "Leaf rust", "treatment": "Spray propiconazole 0.1%", "crop_name": "Wheat"}
+FERTILIZER_ANSWER = {
+    "crop": "Wheat",
+    "area_ha": 1.0,
+    "soil_type": "loamy",
+    "growth_stage": "vegetative",
+    "fertilizer": {
+        "N_kg": 120.0,
+        "P_kg": 60.0,
+        "K_kg": 40.0,
+        "products": [{"name": "Urea", "amount_kg": 260.0}, {"name": "DAP", "amount_kg": 130.0}]
+    },
+    "notes": "Split the nitrogen dose."
+}
+
+
+class GeminiStub(BaseHTTPRequestHandler):
+    delay = 0.0
+    failure_rate = 0.0
+    fail_next = 0
+    calls = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with GeminiStub.lock:
+            GeminiStub.calls += 1
+            fail = GeminiStub.fail_next > 0
+            GeminiStub.fail_next -= fail
+        time.sleep(self.delay)
+
+        if fail or random.random() < self.failure_rate:
+            return self._reply(503, {"error": {"code": 503, "message": "stub overloaded"}})
+
+        parts = body.get("contents", [{}])[0].get("parts", [])
+        answer = DISEASE_ANSWER if any("inline_data" in part for part in parts) else FERTILIZER_ANSWER
+        self._reply(200, {
+            "candidates": [{"content": {"parts": [{"text": "```json\n" + json.dumps(answer) + "\n```"}]}}]
+        })
+
+    def _reply(self, status, data):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=0, delay=0.0, failure_rate=0.0):
+    """Starts the stub on a background thread and returns the server (server.server_port)."""
+    GeminiStub.delay, GeminiStub.failure_rate = delay, failure_rate
+    server = ThreadingHTTPServer(("127.0.0.1", port), GeminiStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--delay", type=float, default=2.0, help="seconds per generation")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of calls answered with 503")
+    args = parser.parse_args()
+
+    server = serve(args.port, args.delay, args.failure_rate)
+    print(f"Gemini stub listening on http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Offline load test of every route in app.py.
+
+The app runs in a child process on a local port, with an in-memory Firestore seeded
+from model_training/final_prices.csv and demand_crops.csv (firestore_fake.py) and the
+Gemini stub (gemini_stub.py) in place of the real services; the SQLite caches start
+empty in a temporary folder. The parent sends --requests requests per route from
+--concurrency client threads and reports latency percentiles and throughput per route.
+--server asgi serves asgi.py with uvicorn instead of app.py with Werkzeug's threaded server.
+Run from the backend/ folder:
+    python benchmarks/load_test.py --concurrency 16 --requests 200
+    python benchmarks/load_test.py --server asgi --routes /cropsCollection,/fertCalculator
+    python benchmarks/load_test.py --routes /cropsCollection,/pastPrices --firestore-latency 30
+"""
+import argparse
+import base64
+import io
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import requests
+from PIL import Image
+
+PRICES_CSV = "../model_training/final_prices.csv"
+DEMAND_CSV = "../model_training/demand_crops.csv"
+
+ROUTES = [
+    "/", "/predict", "/pastPrices", "/cropsCollection", "/predict_demand", "/pastDemand", "/forecast",
+    "/bulkForecast", "/detectDisease", "/detectDisease/upload", "/fertCalculator", "/metrics"
+]
+
+
+def serve(args):
+    """Child process: the app on args.port with the fakes in place."""
+    sys.path.insert(0, ".")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import firestore_fake
+    import gemini_stub
+    from werkzeug.serving import make_server
+
+    client = firestore_fake.FakeFirestore(latency=args.firestore_latency / 1000)
+    firestore_fake.install(firestore_fake.seed_from_csv(client, PRICES_CSV, DEMAND_CSV))
+    stub = gemini_stub.serve(delay=args.gemini_delay)
+
+    cache_dir = tempfile.mkdtemp(prefix="krishi_load_test_")
+    os.environ.update({
+        "GEMINI_BASE_URL": f"http://127.0.0.1:{stub.server_port}",
+        "GEMINI_API_KEY": "stub",
+        "FERT_CACHE_PATH": os.path.join(cache_dir, "fert.sqlite3"),
+        "DISEASE_CACHE_PATH": os.path.join(cache_dir, "disease.sqlite3")
+    })
+    if args.server == "asgi":
+        import uvicorn
+        import asgi
+
+        config = uvicorn.Config(asgi.app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
+        server = uvicorn.Server(config)
+        ready = lambda: server.started
+        serve_forever = server.run
+    else:
+        import app
+
+        wsgi_server = make_server("127.0.0.1", args.port, app.app, threaded=True)
+        ready = lambda: True
+        serve_forever = wsgi_server.serve_forever
+
+    # Nobody reads the pipe after the handshake: drop the app's prints and the access log
+    threading.Thread(target=announce_ready, args=(ready,), daemon=True).start()
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    serve_forever()
+
+
+def announce_ready(ready):
+    while not ready():
+        time.sleep(0.05)
+    print("ready", flush=True)
+    sys.stdout = open(os.devnull, "w")
+
+
+class RequestFactory:
+    """Random but reproducible request bodies over the states, crops and months of the CSVs."""
+
+    def __init__(self, seed, images):
+        self.random = random.Random(seed)
+        df = pd.read_csv(PRICES_CSV, usecols=["state", "crop"])
+        self.pairs = sorted(set(zip(df["state"], df["crop"])))
+        self.states = sorted({state for state, _ in self.pairs})
+        self.images = images
+
+    def _query(self, months=12):
+        state, crop = self.random.choice(self.pairs)
+        start = self.random.randrange(2022 * 12, 2026 * 12)
+        end = start + months - 1
+        return {
+            "state": state, "crop": crop,
+            "startYear": start // 12, "startMonth": start % 12 + 1,
+            "endYear": end // 12, "endMonth": end % 12 + 1
+        }
+
+    def _month(self):
+        return self.random.randrange(2022, 2026), self.random.randrange(1, 13)
+
+    def make(self, route):
+        """Returns requests.request() keyword arguments for one call of route."""
+        if route in ("/", "/metrics"):
+            return {"method": "GET"}
+        if route in ("/predict", "/predict_demand", "/forecast"):
+            return {"method": "POST", "json": self._query()}
+        if route in ("/pastPrices", "/pastDemand"):
+            state, crop = self.random.choice(self.pairs)
+            year, month = self._month()
+            return {"method": "POST", "json": {"state": state, "crop": crop, "year": year, "month": month}}
+        if route == "/cropsCollection":
+            year, month = self._month()
+            return {"method": "POST", "json": {
+                "selectedState": self.random.choice(self.states),
+                "previousMonth": f"{month:02d}-{year}",
+                "nextMonth": f"{month % 12 + 1:02d}-{year + month // 12}"
+            }}
+        if route == "/bulkForecast":
+            return {"method": "POST", "json": {"queries": [self._query() for _ in range(5)]}}
+        if route == "/detectDisease":
+            image = self.random.choice(self.images)
+            return {"method": "POST", "json": {"image_base64": base64.b64encode(image).decode(), "language": "English"}}
+        if route == "/detectDisease/upload":
+            image = self.random.choice(self.images)
+            return {"method": "POST", "files": {"image": ("leaf.jpg", image, "image/jpeg")}, "data": {"language": "Hindi"}}
+        if route == "/fertCalculator":
+            return {"method": "POST", "json": {
+                "crop": self.random.choice(self.pairs)[1],
+                "area_ha": round(self.random.uniform(0.5, 5), 2),
+                "soil_type": self.random.choice(["loamy", "clay", "sandy"]),
+                "growth_stage": self.random.choice(["sowing", "vegetative", "flowering"])
+            }}
+        raise ValueError(f"Unknown route {route}")
+
+
+def make_images(count, megapixels, seed):
+    """Synthetic leaf photos (noise on a green gradient) as JPEG bytes."""
+    rng = np.random.default_rng(seed)
+    height = int((megapixels * 1e6 * 3 / 4) ** 0.5)
+    width = height * 4 // 3
+    images = []
+    for _ in range(count):
+        y = np.linspace(0, 1, height)[:, None, None]
+        base = np.concatenate([y * 80, 120 + y * 100, y * 60], axis=-1) * np.ones((1, width, 1))
+        pixels = (base + rng.integers(0, 40, (height, width, 3))).clip(0, 255).astype("uint8")
+        out = io.BytesIO()
+        Image.fromarray(pixels).save(out, "JPEG", quality=90)
+        images.append(out.getvalue())
+    return images
+
+
+def run_route(base_url, route, factory, n_requests, concurrency):
+    """Sends n_requests calls of route from concurrency threads; returns (latencies, errors, seconds)."""
+    calls = [factory.make(route) for _ in range(n_requests)]
+    sessions = threading.local()
+    latencies, errors = [], 0
+    lock = threading.Lock()
+
+    def call(kwargs):
+        nonlocal errors
+        session = getattr(sessions, "session", None)
+        if session is None:
+            session = sessions.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            ok = session.request(url=base_url + route, timeout=120, **kwargs).status_code < 400
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            errors += not ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(call, calls))
+    return latencies, errors, time.perf_counter() - start
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", default=",".join(ROUTES), help="comma-separated routes to drive")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads per route")
+    parser.add_argument("--requests", type=int, default=100, help="requests per route")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests per route first")
+    parser.add_argument("--firestore-latency", type=float, default=10.0, help="ms per Firestore round trip")
+    parser.add_argument("--gemini-delay", type=float, default=0.5, help="seconds per Gemini generation")
+    parser.add_argument("--images", type=int, default=8, help="distinct photos sent to /detectDisease")
+    parser.add_argument("--megapixels", type=float, default=3.0, help="size of those photos")
+    parser.add_argument("--server", choices=["wsgi", "asgi"], default="wsgi", help="app.py threaded or asgi.py")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args)
+
+    routes = [route for route in args.routes.split(",") if route]
+    port = args.port or free_port()
+    child = subprocess.Popen(
+        [sys.executable, __file__, "--serve", "--server", args.server, "--port", str(port),
+         "--firestore-latency", str(args.firestore_latency), "--gemini-delay", str(args.gemini_delay)],
+        stdout=subprocess.PIPE, text=True
+    )
+    try:
+        # Wait for the app to import and bind
+        for line in child.stdout:
+            if line.strip() == "ready":
+                break
+        else:
+            sys.exit("app failed to start")
+
+        base_url = f"http://127.0.0.1:{port}"
+        factory = RequestFactory(args.seed, make_images(args.images, args.megapixels, args.seed))
+        print(f"{args.server}: {len(routes)} routes, {args.requests} requests each at concurrency {args.concurrency}, "
+              f"Firestore {args.firestore_latency:g} ms, Gemini {args.gemini_delay:g} s\n")
+        print(f"{'route':<22} | {'errors':>6} | {'p50 (ms)':>8} | {'p95 (ms)':>8} | {'p99 (ms)':>8} | {'req/s':>7}")
+        for route in routes:
+            run_route(base_url, route, factory, args.warmup, min(args.concurrency, max(args.warmup, 1)))
+            latencies, errors, seconds = run_route(base_url, route, factory, args.requests, args.concurrency)
+            p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+            print(f"{route:<22} | {errors:>6} | {p50:>8.1f} | {p95:>8.1f} | {p99:>8.1f} | {len(latencies) / seconds:>7.1f}")
+    finally:
+        child.terminate()
+        child.wait()
+
+
+if __name__ == "__main__":
+    main()
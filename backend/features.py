@@ -0,0 +1,210 @@
+import json
+import os
+import threading
+
+import joblib
+import numpy as np
+from scipy.spatial import cKDTree
+
+WEATHER_COLUMNS = ["temperature", "rainfall", "soil_moisture", "ndvi"]
+
+
+class RandomFeatureProvider:
+    """Random placeholder weather and market features.
+
+    Every call returns different values, so predictions made from them are never cached.
+    """
+
+    deterministic = False
+
+    def weather(self, state, month, year):
+        return {
+            "temperature": np.random.uniform(20, 45),
+            "rainfall": np.random.uniform(0, 300),
+            "soil_moisture": np.random.uniform(0.1, 0.5),
+            "ndvi": np.random.uniform(0.2, 0.7)
+        }
+
+    def weather_many(self, states, months, years):
+        rows = [self.weather(state, month, year) for state, month, year in zip(states, months, years)]
+        return np.array([[row[column] for column in WEATHER_COLUMNS] for row in rows]).reshape(-1, len(WEATHER_COLUMNS))
+
+    def market(self, state, crop, month, year):
+        return {
+            "seasonality": np.random.uniform(0.5, 1.5),
+            "marketing_spend": np.random.uniform(10000, 50000),
+            "competitor_price": np.random.uniform(10, 50),
+            "special_event": np.random.choice([0, 1], p=[0.8, 0.2]),
+            "supply": np.random.uniform(500, 2000)
+        }
+
+
+class WeatherStore:
+    """Monthly weather per state and per location (model_training/weather_store.py).
+
+    The tables are memory-mapped arrays indexed by (state or location, calendar month),
+    so a lookup is array indexing and weather_many() serves any number of months at
+    once. Locations are found by coordinates through a KD-tree over points on the unit
+    sphere. The state means equal the climatology's.
+    """
+
+    def __init__(self, prefix):
+        with open(f"{prefix}_meta.json") as f:
+            meta = json.load(f)
+        self.columns = meta["columns"]
+        self.state_index = {state: i for i, state in enumerate(meta["states"])}
+        self.locations = [tuple(location) for location in meta["locations"]]
+        self.by_state = np.load(f"{prefix}_by_state.npy", mmap_mode="r")
+        self.by_location = np.load(f"{prefix}_by_location.npy", mmap_mode="r")
+        self._tree = cKDTree(self._unit_vectors(np.load(f"{prefix}_locations.npy")))
+
+    @staticmethod
+    def _unit_vectors(coordinates):
+        latitude, longitude = np.radians(np.asarray(coordinates, dtype=float).reshape(-1, 2)).T
+        return np.column_stack([
+            np.cos(latitude) * np.cos(longitude),
+            np.cos(latitude) * np.sin(longitude),
+            np.sin(latitude)
+        ])
+
+    def weather_many(self, states, months):
+        """len(states) x columns array of the weather of each (state, calendar month).
+
+        Unknown states get the mean of the month over all states (the last row).
+        """
+        unknown = len(self.state_index)
+        rows = np.fromiter((self.state_index.get(state, unknown) for state in states), dtype=np.intp)
+        return self.by_state[rows, np.asarray(months, dtype=np.intp) - 1]
+
+    def nearest(self, latitudes, longitudes):
+        """Index of the location closest to each (latitude, longitude)."""
+        _, index = self._tree.query(self._unit_vectors(np.column_stack([latitudes, longitudes])))
+        return index
+
+    def weather_at(self, latitudes, longitudes, months):
+        """Weather of the location closest to each point, in its calendar month."""
+        return self.by_location[self.nearest(latitudes, longitudes), np.asarray(months, dtype=np.intp) - 1]
+
+
+def load_weather_store(prefix):
+    """Returns the WeatherStore saved under prefix, or None if it has not been built."""
+    if not os.path.exists(f"{prefix}_meta.json"):
+        return None
+    return WeatherStore(prefix)
+
+
+class ClimatologyFeatureProvider:
+    """Monthly averages of the training data (see model_training/climatology.py).
+
+    Features depend only on state, crop and calendar month, so the same query always
+    gets the same features and the same prediction. Weather comes from the weather
+    store when one is given.
+    """
+
+    deterministic = True
+
+    def __init__(self, path, weather_store=None):
+        climatology = joblib.load(path)
+        self._weather = climatology["weather"]
+        self._market = climatology["market"]
+        self.weather_store = weather_store
+
+    @staticmethod
+    def _lookup(climatology, **keys):
+        for level in climatology["levels"]:
+            row = climatology["tables"][level].get(tuple(keys[name] for name in level))
+            if row is not None:
+                return dict(row)
+        raise KeyError(keys)
+
+    def weather(self, state, month, year):
+        if self.weather_store is not None:
+            return dict(zip(WEATHER_COLUMNS, self.weather_many([state], [month], [year])[0].tolist()))
+        return self._lookup(self._weather, state=state, month=month)
+
+    def weather_many(self, states, months, years):
+        """len(states) x WEATHER_COLUMNS array of the weather of each (state, month, year)."""
+        if self.weather_store is not None:
+            return self.weather_store.weather_many(states, months)
+        rows = [self.weather(state, month, year) for state, month, year in zip(states, months, years)]
+        return np.array([[row[column] for column in WEATHER_COLUMNS] for row in rows]).reshape(-1, len(WEATHER_COLUMNS))
+
+    def market(self, state, crop, month, year):
+        return self._lookup(self._market, state=state, crop=crop, month=month)
+
+
+class DemandFeatureAssembler:
+    """Builds the scaled demand model input straight into a reusable NumPy buffer.
+
+    Columns are written in the model's feature order, labels are encoded with label→code
+    dicts and the numerical columns are standardized with the scaler's mean_ and scale_,
+    the same arithmetic as StandardScaler.transform, so the input is bit-identical to the
+    DataFrame + transform + reindex path. Each thread has its own buffer; the returned
+    array is a view of it, valid until the thread's next call.
+    """
+
+    # Numerical columns, in the order the scaler was fitted on (same as in training)
+    NUMERICAL_COLUMNS = ["price", "marketing_spend", "competitor_price", "supply"]
+    MARKET_COLUMNS = ["seasonality", "special_event", "marketing_spend", "competitor_price", "supply"]
+
+    def __init__(self, feature_names, scaler, label_encoders, market):
+        columns = {name: i for i, name in enumerate(feature_names)}
+        self.n_features = len(columns)
+        self._market = market
+        self._codes = {
+            field: {label: code for code, label in enumerate(encoder.classes_)}
+            for field, encoder in label_encoders.items()
+        }
+        self._state, self._crop = columns["state"], columns["crop"]
+        self._year, self._month, self._price = columns["year"], columns["month"], columns["price"]
+        self._market_columns = [(name, columns[name]) for name in self.MARKET_COLUMNS]
+        self._scaled = np.array([columns[name] for name in self.NUMERICAL_COLUMNS])
+        self._mean = scaler.mean_ if scaler.with_mean else np.zeros(len(self._scaled))
+        self._scale = scaler.scale_ if scaler.with_std else np.ones(len(self._scaled))
+        self._local = threading.local()
+
+    def _encode(self, field, label):
+        code = self._codes[field].get(label)
+        if code is None:
+            print(f"⚠ Warning: Unseen label '{label}' detected. Using default encoding (0).")
+            return 0
+        return code
+
+    def _buffer(self, n_rows):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or len(buffer) < n_rows:
+            buffer = self._local.buffer = np.empty((max(n_rows, 16), self.n_features))
+        return buffer[:n_rows]
+
+    def build(self, keys):
+        """Model input for ("demand", state, crop, year, month, price) keys, one row per key."""
+        X = self._buffer(len(keys))
+        for row, (_, state, crop, year, month, price) in enumerate(keys):
+            features = self._market(state, crop, month, year)
+            values = X[row]
+            values[self._state] = self._encode("state", state)
+            values[self._crop] = self._encode("crop", crop)
+            values[self._year] = year
+            values[self._month] = month
+            values[self._price] = price
+            for name, column in self._market_columns:
+                values[column] = features[name]
+
+        # Standardize the numerical columns in one block
+        block = X[:, self._scaled]
+        block -= self._mean
+        block /= self._scale
+        X[:, self._scaled] = block
+        return X
+
+
+def load_feature_provider(name, climatology_path, weather_prefix=None):
+    """Returns the feature provider called name ("climatology" or "random")."""
+    if name == "random":
+        return RandomFeatureProvider()
+    if name != "climatology":
+        raise ValueError(f"Unknown feature provider '{name}'")
+    if not os.path.exists(climatology_path):
+        print(f"⚠ Warning: {climatology_path} not found. Using random features.")
+        return RandomFeatureProvider()
+    return ClimatologyFeatureProvider(climatology_path, load_weather_store(weather_prefix) if weather_prefix else None)
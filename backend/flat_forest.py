@@ -0,0 +1,117 @@
+import json
+import threading
+import time
+
+import joblib
+import numpy as np
+
+# Rows walked through the forest at once, bounds the temporary (rows x trees) arrays
+BLOCK_ROWS = 256
+
+
+class FlatExportOutdated(Exception):
+    """The flat export predates a field FlatForest needs."""
+
+
+class FlatForest:
+    """Random forest regressor stored as flat node arrays (see model_training/export_flat_models.py).
+
+    The node file is memory-mapped, so loading is instant and forked workers share the
+    same pages instead of each unpickling its own copy of every tree.
+    """
+
+    def __init__(self, prefix):
+        with open(f"{prefix}.flat.json") as f:
+            meta = json.load(f)
+        nodes = np.load(f"{prefix}.flat.npy", mmap_mode="r")
+        self.feature = nodes["feature"]
+        self.threshold = nodes["threshold"]
+        self.left = nodes["left"]
+        self.right = nodes["right"]
+        if "missing_left" not in nodes.dtype.names:
+            raise FlatExportOutdated(f"{prefix}.flat.npy has no missing_left field, export it again")
+        self.missing_left = nodes["missing_left"]
+        self.value = nodes["value"]
+        self.roots = np.asarray(meta["roots"], dtype=np.int64)
+        self.max_depth = meta["max_depth"]
+        self.n_features_in_ = meta["n_features"]
+        if meta["feature_names"]:
+            self.feature_names_in_ = np.asarray(meta["feature_names"], dtype=object)
+
+    def predict(self, X):
+        # sklearn trees compare float32 features against their thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        return np.concatenate([
+            self._predict_block(X[start:start + BLOCK_ROWS])
+            for start in range(0, len(X), BLOCK_ROWS)
+        ]) if len(X) else np.empty(0)
+
+    def _predict_block(self, X):
+        rows = np.arange(len(X))[:, None]
+
+        # Walk every tree for every row at once; leaves point to themselves
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            # NaN features go to the side the split learned, like sklearn
+            values = X[rows, self.feature[nodes]]
+            go_left = np.where(np.isnan(values), self.missing_left[nodes], values <= self.threshold[nodes])
+            next_nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+            if np.array_equal(next_nodes, nodes):
+                break
+            nodes = next_nodes
+
+        return self.value[nodes].mean(axis=1)
+
+
+class LazyArtifact:
+    """Loads a model artifact on first use and then behaves like it.
+
+    Attribute access and indexing are forwarded to the loaded object. load_seconds
+    holds the duration of the last load once it happened.
+    """
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._artifact = None
+        self._lock = threading.Lock()
+        self.load_seconds = None
+
+    @property
+    def loaded(self):
+        return self._artifact is not None
+
+    def load(self):
+        if self._artifact is None:
+            with self._lock:
+                if self._artifact is None:
+                    start = time.perf_counter()
+                    self._artifact = self._loader()
+                    self.load_seconds = time.perf_counter() - start
+        return self._artifact
+
+    def reload(self):
+        """Loads the artifact again and swaps it in if it was loaded; users keep the old one meanwhile."""
+        if self._artifact is None:
+            return
+        start = time.perf_counter()
+        artifact = self._loader()
+        with self._lock:
+            self._artifact = artifact
+            self.load_seconds = time.perf_counter() - start
+
+    def __getattr__(self, name):
+        return getattr(self.load(), name)
+
+    def __getitem__(self, key):
+        return self.load()[key]
+
+
+def load_forest(name):
+    """Returns the FlatForest export of <name>.pkl if it exists, else the pickled forest."""
+    try:
+        return FlatForest(name)
+    except FileNotFoundError:
+        return joblib.load(f"{name}.pkl")
+    except FlatExportOutdated as e:
+        print(f"⚠ Warning: {e}. Using {name}.pkl.")
+        return joblib.load(f"{name}.pkl")
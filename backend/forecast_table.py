@@ -0,0 +1,54 @@
+import json
+import os
+
+import numpy as np
+
+
+class ForecastTable:
+    """Precomputed forecasts from model_training/build_forecast_table.py.
+
+    The price and demand tensors (states x crops x months) are memory-mapped, so
+    forked workers share the same pages and a lookup is plain array indexing.
+    """
+
+    def __init__(self, prefix):
+        with open(f"{prefix}_meta.json") as f:
+            meta = json.load(f)
+        self.state_index = {state: i for i, state in enumerate(meta["states"])}
+        self.crop_index = {crop: i for i, crop in enumerate(meta["crops"])}
+        self.start_year = meta["start_year"]
+        self.start_month = meta["start_month"]
+        self.months = meta["months"]
+        self.prices = np.load(f"{prefix}_prices.npy", mmap_mode="r")
+        self.demand = np.load(f"{prefix}_demand.npy", mmap_mode="r")
+
+    def _cell(self, state, crop, year, month):
+        s = self.state_index.get(state)
+        c = self.crop_index.get(crop)
+        m = (year - self.start_year) * 12 + (month - self.start_month)
+        if s is None or c is None or not 0 <= m < self.months:
+            return None
+        return s, c, m
+
+    def lookup(self, key):
+        """Returns the precomputed value for a prediction cache key, or None outside the table.
+
+        Demand is only precomputed for the predicted price of its month, so a demand key
+        with any other price (e.g. a price stored in Firestore) is not served from the table.
+        """
+        kind, state, crop, year, month = key[:5]
+        cell = self._cell(state, crop, year, month)
+        if cell is None:
+            return None
+        if kind == "price":
+            return float(self.prices[cell])
+        if kind == "demand" and round(float(self.prices[cell]), 2) == key[5]:
+            return float(self.demand[cell])
+        return None
+
+
+def load_forecast_table(prefix):
+    """Returns the ForecastTable saved under prefix, or None if it has not been built."""
+    if not os.path.exists(f"{prefix}_meta.json"):
+        return None
+    return ForecastTable(prefix)
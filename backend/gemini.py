@@ -0,0 +1,76 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class GeminiBusyError(Exception):
+    """Raised when every Gemini slot stays taken for longer than the queue timeout."""
+
+
+class GeminiClient:
+    """Shared client for the Gemini generateContent endpoint.
+
+    Calls go through one pooled keep-alive session with timeouts and retries with
+    backoff, and run on a dedicated thread pool. At most max_concurrency calls are in
+    flight; further callers wait up to queue_timeout seconds for a slot, then get
+    GeminiBusyError instead of piling up on a slow upstream.
+    """
+
+    def __init__(self, api_key, base_url, model, max_concurrency=4, connect_timeout=5,
+                 read_timeout=60, retries=2, queue_timeout=30):
+        self.url = f"{base_url}/v1/models/{model}:generateContent"
+        self.api_key = api_key
+        self.timeout = (connect_timeout, read_timeout)
+        self.queue_timeout = queue_timeout
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=None,  # generateContent is safe to retry, including POST
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Content-Type"] = "application/json"
+
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="gemini")
+
+    def _post(self, payload):
+        try:
+            response = self.session.post(self.url, params={"key": self.api_key}, json=payload, timeout=self.timeout)
+            return response.json(), response.status_code
+        finally:
+            self._slots.release()
+
+    def submit(self, payload, queue_timeout=None):
+        """Schedules a generateContent call and returns a Future of (response json, status code)."""
+        if queue_timeout is None:
+            queue_timeout = self.queue_timeout
+        if not self._slots.acquire(timeout=queue_timeout):
+            raise GeminiBusyError("Too many Gemini requests in flight, try again later")
+        try:
+            return self._executor.submit(self._post, payload)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def generate(self, payload):
+        """Calls generateContent and returns (response json, status code)."""
+        return self.submit(payload).result()
+
+    async def generate_async(self, payload):
+        """generate() for asyncio code: neither the wait for a slot nor the call blocks the event loop."""
+        try:
+            future = self.submit(payload, queue_timeout=0)
+        except GeminiBusyError:
+            # Every slot is taken: wait for one on a helper thread
+            future = await asyncio.to_thread(self.submit, payload)
+        return await asyncio.wrap_future(future)
@@ -0,0 +1,89 @@
+import gzip
+import hashlib
+import threading
+
+import brotli
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_BYTES = 512
+
+# Preferred first when the client accepts both with the same weight
+ENCODINGS = ("br", "gzip")
+
+
+def make_etag(body, version):
+    """Strong ETag of a response body served by a model version."""
+    return f'"{version}-{hashlib.sha256(body).hexdigest()[:20]}"'
+
+
+def variant_etag(etag, encoding):
+    """ETag of a content coding of a body; each coding needs its own strong ETag (RFC 9110)."""
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+
+def etag_matches(if_none_match, etag):
+    """True if an If-None-Match header names etag (weak comparison, as RFC 9110 asks for GET)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in tags
+
+
+def accepted_encoding(accept_encoding):
+    """The encoding of ENCODINGS the client prefers, None for identity."""
+    weights = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for coding in ENCODINGS:
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+class EncodedResponse:
+    """A response body with its ETag and its compressed variants.
+
+    Each variant is compressed the first time a client asks for it and kept, so a
+    cached response is compressed at most once per encoding.
+    """
+
+    def __init__(self, body, etag, content_type):
+        self.body = body
+        self.etag = etag
+        self.content_type = content_type
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    def encoding(self, accept_encoding):
+        """The encoding sent for a request's Accept-Encoding, None for identity."""
+        return accepted_encoding(accept_encoding) if len(self.body) >= MIN_COMPRESS_BYTES else None
+
+    def etag_for(self, encoding):
+        return variant_etag(self.etag, encoding)
+
+    def encoded(self, encoding):
+        """The body in an encoding returned by encoding(), None for identity."""
+        if encoding is None:
+            return self.body
+        with self._lock:
+            variant = self._variants.get(encoding)
+            if variant is None:
+                if encoding == "br":
+                    variant = brotli.compress(self.body, mode=brotli.MODE_TEXT, quality=9)
+                else:
+                    variant = gzip.compress(self.body, compresslevel=6)
+                self._variants[encoding] = variant
+        return variant
@@ -0,0 +1,22 @@
+import io
+
+from PIL import Image, ImageOps
+
+
+def downscale_image(fp, max_side=1024, quality=85):
+    """Decodes an uploaded photo and re-encodes it as a JPEG no larger than max_side pixels.
+
+    fp is a file object (an upload stream or a spooled temporary file). JPEGs are decoded
+    directly at a reduced scale (draft mode), so a large photo is never held in memory at
+    full resolution. Returns the JPEG bytes.
+    """
+    with Image.open(fp) as image:
+        image.draft("RGB", (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+
+        out = io.BytesIO()
+        image.save(out, format="JPEG", quality=quality, optimize=True)
+    return out.getvalue()
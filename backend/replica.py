@@ -0,0 +1,154 @@
+import threading
+import time
+
+
+class CropDataReplica:
+    """In-process copy of the crop_data/<state>/<crop>/<MM-YYYY> documents.
+
+    start() lists the states and their crop collections on a background thread and puts
+    a snapshot listener on every crop collection: its initial snapshot loads the
+    documents and later snapshots apply changes as they happen. The tree is listed
+    again every sync_seconds to pick up new states and crops, and to replace listeners
+    whose stream has died by new ones.
+
+    Each listener is last known to be current when it delivered a snapshot or when a
+    sync found its stream alive. The lag is the age of the oldest of these times, so a
+    dead listener or a failing sync makes it grow. The replica is fresh once every
+    listener delivered its initial snapshot and while the lag is under max_lag_seconds;
+    callers are expected to read Firestore directly when it is not.
+    """
+
+    def __init__(self, db, sync_seconds=60, max_lag_seconds=300):
+        self._db = db
+        self.sync_seconds = sync_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self.synced_at = None
+        self.fallbacks = 0
+        self.resubscribes = 0
+        self.version = 0  # bumped by every snapshot that brings changes
+        self._states = {}  # state -> crop -> "MM-YYYY" -> document data
+        self._watches = {}  # (state, crop) -> listener, None while subscribing
+        self._generations = {}  # (state, crop) -> number of the current subscription
+        self._current_at = {}  # (state, crop) -> time the listener was last known to be current
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self._run, name="crop-data-replica", daemon=True).start()
+
+    def _run(self):
+        while True:
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"Error syncing the crop_data replica: {e}")
+            time.sleep(self.sync_seconds)
+
+    def sync(self):
+        """Lists the crop collections of every state and watches the ones without a live listener."""
+        listed = set()
+        for state_doc_ref in self._db.collection('crop_data').list_documents():
+            for crop_collection in state_doc_ref.collections():
+                listed.add((state_doc_ref.id, crop_collection.id))
+                self._watch(state_doc_ref.id, crop_collection)
+
+        now = time.time()
+        with self._lock:
+            for key, watch in self._watches.items():
+                if key not in listed:
+                    # A collection that is gone no longer holds the lag back
+                    self._current_at.pop(key, None)
+                elif watch is not None and key not in self._pending and self._alive(watch):
+                    self._current_at[key] = now
+        self.synced_at = now
+
+    @staticmethod
+    def _alive(watch):
+        # Listeners of google-cloud-firestore report whether their stream is still open
+        return getattr(watch, "is_active", True)
+
+    def _watch(self, state, crop_collection):
+        key = (state, crop_collection.id)
+        with self._lock:
+            watch = self._watches.get(key)
+            if key in self._watches and (watch is None or self._alive(watch)):
+                return
+            if watch is not None:
+                self.resubscribes += 1
+            self._watches[key] = None
+            self._pending.add(key)
+            generation = self._generations[key] = self._generations.get(key, 0) + 1
+
+        if watch is not None:
+            print(f"⚠ Listener of crop_data/{state}/{key[1]} stopped, subscribing again")
+            try:
+                watch.unsubscribe()
+            except Exception:
+                pass
+
+        def on_snapshot(collection_snapshot, changes, read_time):
+            with self._lock:
+                if self._generations.get(key) != generation:
+                    return  # a replaced listener
+                crops = self._states.setdefault(state, {})
+                if key in self._pending:
+                    # The initial snapshot holds every document, including after a resubscribe
+                    crops[key[1]] = {snapshot.id: snapshot.to_dict() for snapshot in collection_snapshot}
+                else:
+                    months = crops.setdefault(key[1], {})
+                    for change in changes:
+                        if change.type.name == 'REMOVED':
+                            months.pop(change.document.id, None)
+                        else:
+                            months[change.document.id] = change.document.to_dict()
+                if changes:
+                    self.version += 1
+                self._pending.discard(key)
+                self._current_at[key] = time.time()
+
+        try:
+            watch = crop_collection.on_snapshot(on_snapshot)
+            with self._lock:
+                self._watches[key] = watch
+        except Exception:
+            # Retried by the next sync
+            with self._lock:
+                del self._watches[key]
+                self._pending.discard(key)
+            raise
+
+    def lag_seconds(self):
+        """Seconds since the least recently confirmed listener was current, None before the first sync."""
+        if self.synced_at is None:
+            return None
+        with self._lock:
+            oldest = min(self._current_at.values(), default=self.synced_at)
+        return time.time() - oldest
+
+    def fresh(self):
+        lag = self.lag_seconds()
+        return lag is not None and lag <= self.max_lag_seconds and not self._pending
+
+    def count_fallback(self):
+        with self._lock:
+            self.fallbacks += 1
+
+    def crops(self, state):
+        """Names of the crop collections of a state that hold documents, sorted like Firestore lists them."""
+        with self._lock:
+            return sorted(crop for crop, months in self._states.get(state, {}).items() if months)
+
+    def get(self, state, cells):
+        """{(crop, "MM-YYYY"): document data} for cells of one state, None for missing documents."""
+        with self._lock:
+            crops = self._states.get(state, {})
+            return {(crop, db_month): crops.get(crop, {}).get(db_month) for crop, db_month in cells}
+
+    def stats(self):
+        with self._lock:
+            return {
+                "documents": sum(len(months) for crops in self._states.values() for months in crops.values()),
+                "watches": len(self._watches),
+                "fallbacks": self.fallbacks,
+                "resubscribes": self.resubscribes,
+            }
@@ -0,0 +1,23 @@
+"""
+Imports app.py with the in-memory Firestore of benchmarks/firestore_fake.py in place of
+Firebase, the replica and model polling off and the SQLite caches in a temporary folder.
+Test modules share the app and CLIENT through this module.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+import firestore_fake  # noqa: E402
+
+CLIENT = firestore_fake.FakeFirestore()
+firestore_fake.install(CLIENT)
+
+CACHE_DIR = tempfile.mkdtemp(prefix="krishi_tests_")
+os.environ.update({
+    "REPLICA_ENABLED": "0",
+    "MODEL_POLL_SECONDS": "0",
+    "FERT_CACHE_PATH": os.path.join(CACHE_DIR, "fert.sqlite3"),
+    "DISEASE_CACHE_PATH": os.path.join(CACHE_DIR, "disease.sqlite3"),
+})
+import app  # noqa: E402,F401
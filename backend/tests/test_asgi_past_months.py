@@ -0,0 +1,39 @@
+"""
+/pastPrices and /pastDemand in async mode answer invalid years and months with the same
+JSON errors as the Flask app. Run from the backend/ folder:
+    python -m pytest tests
+"""
+import asyncio
+import unittest
+
+import httpx
+
+from support import app
+import asgi
+
+
+def asgi_post(path, body):
+    async def post():
+        transport = httpx.ASGITransport(app=asgi.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, json=body)
+
+    return asyncio.run(post())
+
+
+class PastMonthsErrorsTest(unittest.TestCase):
+    def setUp(self):
+        self.client = app.app.test_client()
+
+    def test_same_json_errors_as_flask(self):
+        for route in ("/pastPrices", "/pastDemand"):
+            for body, status_code in (
+                ({"state": "Punjab", "crop": "Wheat", "year": 2024, "month": 13}, 500),
+                ({"state": "Punjab", "crop": "Wheat", "year": 2024, "month": "may"}, 400),
+                ({"state": "Punjab", "crop": "Wheat", "year": 2024}, 400),
+            ):
+                flask_response = self.client.post(route, json=body)
+                asgi_response = asgi_post(route, body)
+                self.assertEqual(flask_response.status_code, status_code, (route, body))
+                self.assertEqual(asgi_response.status_code, status_code, (route, body))
+                self.assertEqual(asgi_response.json(), flask_response.json)
@@ -0,0 +1,46 @@
+"""
+Request checks of /bulkForecast. Run from the backend/ folder:
+    python -m pytest tests
+"""
+import time
+import unittest
+
+from support import app
+
+
+class BulkForecastTest(unittest.TestCase):
+    QUERY = {"state": "Bihar", "crop": "Wheat", "startYear": 2024, "startMonth": 11, "endYear": 2025, "endMonth": 2}
+
+    def setUp(self):
+        self.client = app.app.test_client()
+
+    def bulk_forecast(self, queries):
+        return self.client.post("/bulkForecast", json={"queries": queries, "format": "columnar"})
+
+    def test_month_count_matches_month_range(self):
+        for bounds in [(2024, 11, 2025, 2), (2024, 1, 2024, 1), (2024, 5, 2023, 5), (1999, 12, 2030, 1)]:
+            self.assertEqual(app.month_count(*bounds), len(app.month_range(*bounds)))
+
+    def test_too_many_months_are_rejected_before_expanding(self):
+        queries = [dict(self.QUERY, startYear=1, startMonth=1, endYear=9998, endMonth=12)] * 50
+
+        start = time.perf_counter()
+        response = self.bulk_forecast(queries)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+    def test_invalid_queries_get_their_own_error(self):
+        response = self.bulk_forecast([
+            "bad", dict(self.QUERY, startMonth=13), dict(self.QUERY, endYear="2025"), self.QUERY
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json["results"]
+        self.assertTrue(all("error" in result for result in results[:3]))
+        self.assertEqual(len(results[3]["price"]), 4)
+        self.assertEqual(results[3]["month"][0], "November 2024")
+
+
+if __name__ == "__main__":
+    unittest.main()
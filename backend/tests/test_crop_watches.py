@@ -0,0 +1,64 @@
+"""
+Snapshot listeners opened by reads through doc_cache (replica off), against the in-memory
+Firestore of benchmarks/firestore_fake.py. Run from the backend/ folder:
+    python -m pytest tests
+"""
+import unittest
+
+from support import CLIENT, app
+
+
+class CropWatchesTest(unittest.TestCase):
+    def setUp(self):
+        CLIENT.documents.clear()
+        CLIENT.documents[("crop_data", "Bihar", "Wheat", "01-2024")] = {"price": 2000.0}
+        CLIENT.documents[("crop_data", "Bihar", "Makhana", "01-2024")] = {"price": 9000.0}
+        app.doc_cache.clear()
+        app.response_cache.clear()
+        with app.crop_watches_lock:
+            app.crop_watches.clear()
+        self.client = app.app.test_client()
+
+    def past_prices(self, state, crop):
+        response = self.client.post("/pastPrices", json={"state": state, "crop": crop, "year": 2024, "month": 1})
+        self.assertEqual(response.status_code, 200)
+        return response.json
+
+    def test_made_up_crops_are_not_watched(self):
+        for i in range(50):
+            self.past_prices("Bihar", f"NoSuchCrop{i}")
+
+        self.assertEqual(len(app.crop_watches), 0)
+        self.assertEqual(app.doc_cache.stats()["entries"], 0)
+
+    def test_known_and_existing_crops_are_watched(self):
+        self.past_prices("Bihar", "Wheat")
+        # Not a label of the models, but its collection exists
+        self.assertEqual(self.past_prices("Bihar", "Makhana")[0]["price"], 9000.0)
+
+        self.assertEqual(set(app.crop_watches), {("Bihar", "Wheat"), ("Bihar", "Makhana")})
+
+    def test_watches_are_bounded(self):
+        max_crop_watches = app.MAX_CROP_WATCHES
+        app.MAX_CROP_WATCHES = 2
+        try:
+            for crop in ("Wheat", "Maize", "Makhana"):
+                self.past_prices("Bihar", crop)
+        finally:
+            app.MAX_CROP_WATCHES = max_crop_watches
+
+        # The least recently used watch is closed and its documents leave the cache
+        self.assertEqual(list(app.crop_watches), [("Bihar", "Maize"), ("Bihar", "Makhana")])
+        self.assertIs(app.doc_cache.get(("Bihar", "Wheat", "01-2024")), app.MISSING)
+
+    def test_reads_do_not_overwrite_newer_changes(self):
+        # The listener saw the month being created after a read found it missing
+        app.doc_cache.set(("Bihar", "Wheat", "02-2024"), {"price": 2100.0})
+        app.cache_fetched_docs("Bihar", {("Wheat", "02-2024"): None, ("Wheat", "01-2024"): {"price": 2000.0}})
+
+        self.assertEqual(app.doc_cache.get(("Bihar", "Wheat", "02-2024")), {"price": 2100.0})
+        self.assertEqual(app.doc_cache.get(("Bihar", "Wheat", "01-2024")), {"price": 2000.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
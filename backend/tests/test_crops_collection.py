@@ -0,0 +1,59 @@
+"""
+/cropsCollection against the in-memory Firestore of benchmarks/firestore_fake.py, counting
+round trips. Run from the backend/ folder (the models are loaded from it):
+    python -m pytest tests
+"""
+import unittest
+
+from support import CLIENT, app
+
+
+class CropsCollectionTest(unittest.TestCase):
+    STATE = "Bihar"
+    # 2 months x 60 crops = 120 documents, more than one batched read holds
+    CROPS = ["Wheat", "Maize"] + [f"Crop{i:02d}" for i in range(58)]
+
+    def setUp(self):
+        CLIENT.documents.clear()
+        for crop in self.CROPS:
+            CLIENT.documents[("crop_data", self.STATE, crop, "12-2023")] = {"price": 1000.0, "demand": 50.0}
+        app.doc_cache.clear()
+        app.response_cache.clear()
+        self.client = app.app.test_client()
+
+    def crops_collection(self):
+        CLIENT.round_trips = 0
+        response = self.client.post("/cropsCollection", json={
+            "selectedState": self.STATE, "previousMonth": "12-2023", "nextMonth": "01-2024"
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.json["crops"]
+
+    def test_documents_are_read_in_batches(self):
+        crops = self.crops_collection()
+
+        # One listing of the crop collections, then ceil(120 / FIRESTORE_BATCH_SIZE) batched reads
+        batches = -(-2 * len(self.CROPS) // app.FIRESTORE_BATCH_SIZE)
+        self.assertEqual(CLIENT.round_trips, 1 + batches)
+        self.assertEqual([crop["name"] for crop in crops], sorted(self.CROPS))
+        self.assertTrue(all(crop["previousMonthPrice"] == 1000.0 for crop in crops))
+
+    def test_missing_documents_are_predicted(self):
+        crops = {crop["name"]: crop for crop in self.crops_collection()}
+
+        self.assertGreater(crops["Wheat"]["nextMonthPrice"], 0)
+        self.assertGreater(crops["Wheat"]["nextMonthDemand"], 0)
+        # Crops the models don't know get the default price
+        self.assertEqual(crops["Crop00"]["nextMonthPrice"], 100)
+
+    def test_cached_documents_are_not_read_again(self):
+        self.crops_collection()
+        app.response_cache.clear()
+        self.crops_collection()
+
+        # Only the listing of the crop collections
+        self.assertEqual(CLIENT.round_trips, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
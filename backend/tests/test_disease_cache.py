@@ -0,0 +1,66 @@
+"""
+The disease cache is written inside the Gemini single-flight, so a duplicate photo that
+arrives right after a flight ended finds the answer cached, in the Flask app and in
+async mode. Run from the backend/ folder:
+    python -m pytest tests
+"""
+import asyncio
+import os
+import unittest
+
+from support import app
+import asgi
+
+ANSWER = {"disease": "Leaf rust", "treatment": "Propiconazole", "crop_name": "Wheat"}
+
+
+class FakeGemini:
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, payload):
+        self.calls += 1
+        return ANSWER, 200
+
+    async def generate_async(self, payload):
+        return self.generate(payload)
+
+
+class DiseaseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.previous = app.gemini, app.disease_flights.do, asgi.disease_flights.do
+        app.gemini = self.gemini = FakeGemini()
+        self.image = os.urandom(256)
+        self.key = app.disease_cache_key(self.image, "English")
+        self.cached_when_flight_ended = []
+
+    def tearDown(self):
+        app.gemini, app.disease_flights.do, asgi.disease_flights.do = self.previous
+
+    def test_flask_flight_caches_before_it_ends(self):
+        do = app.disease_flights.do
+
+        def checked_do(key, fn):
+            result = do(key, fn)
+            self.cached_when_flight_ended.append(app.disease_cache.get(key) is not None)
+            return result
+
+        app.disease_flights.do = checked_do
+        for _ in range(2):
+            self.assertEqual(app.diagnose_image(self.image, "", "English"), (ANSWER, 200))
+        self.assertEqual(self.cached_when_flight_ended, [True])
+        self.assertEqual(self.gemini.calls, 1)
+
+    def test_async_flight_caches_before_it_ends(self):
+        do = asgi.disease_flights.do
+
+        async def checked_do(key, fn):
+            result = await do(key, fn)
+            self.cached_when_flight_ended.append(app.disease_cache.get(key) is not None)
+            return result
+
+        asgi.disease_flights.do = checked_do
+        for _ in range(2):
+            self.assertEqual(asyncio.run(asgi.diagnose_image(self.image, "", "English")), (ANSWER, 200))
+        self.assertEqual(self.cached_when_flight_ended, [True])
+        self.assertEqual(self.gemini.calls, 1)
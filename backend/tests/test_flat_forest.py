@@ -0,0 +1,55 @@
+"""
+The flat exports of model_training/export_flat_models.py against the pickled forests,
+on rows with NaN features. Run from the backend/ folder, next to the exports:
+    python -m pytest tests
+"""
+import os
+import unittest
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from flat_forest import FlatForest
+
+
+class FlatForestTest(unittest.TestCase):
+    def compare(self, name):
+        if not os.path.exists(f"{name}.flat.npy"):
+            self.skipTest(f"{name} has no flat export")
+        forest = joblib.load(f"{name}.pkl")
+        flat = FlatForest(name)
+
+        rng = np.random.default_rng(0)
+        X = rng.normal(0, 1, (300, forest.n_features_in_))
+        X[:, :4] = rng.integers(0, 12, (300, 4))
+        X[rng.random(X.shape) < 0.3] = np.nan
+        X[0] = np.nan
+        frame = pd.DataFrame(X, columns=getattr(forest, "feature_names_in_", None))
+
+        np.testing.assert_allclose(flat.predict(X), forest.predict(frame), rtol=1e-9)
+
+    def test_price_model_routes_nan_like_sklearn(self):
+        self.compare("price_model")
+
+    def test_demand_model_routes_nan_like_sklearn(self):
+        self.compare("demand_model")
+
+    def test_price_model_on_climatology_rows_with_nan(self):
+        # The climatology has no July temperature for Gujarat and Maharashtra
+        if not os.path.exists("price_model.flat.npy"):
+            self.skipTest("price_model has no flat export")
+        forest = joblib.load("price_model.pkl")
+        states = joblib.load("state_encoder.pkl")
+        crops = joblib.load("crop_encoder.pkl")
+        X = np.array([
+            [states.transform([state])[0], crop, year, 7, np.nan, 250.0, 0.3, 0.5]
+            for state in ("Gujarat", "Maharashtra") for crop in range(len(crops.classes_)) for year in (2023, 2030)
+        ])
+        frame = pd.DataFrame(X, columns=getattr(forest, "feature_names_in_", None))
+
+        np.testing.assert_allclose(FlatForest("price_model").predict(X), forest.predict(frame), rtol=1e-9)
+
+
+if __name__ == "__main__":
+    unittest.main()
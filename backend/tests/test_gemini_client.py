@@ -0,0 +1,78 @@
+"""
+GeminiClient against the local stub of benchmarks/gemini_stub.py: retries of 5xx
+answers, the read timeout and the 503 of /detectDisease and /fertCalculator when every
+slot is taken. Run from the backend/ folder:
+    python -m pytest tests
+"""
+import base64
+import os
+import time
+import unittest
+import uuid
+
+import requests
+
+from support import app
+import gemini_stub
+from gemini import GeminiClient
+
+PAYLOAD = {"contents": [{"parts": [{"text": "Fertilizer for wheat"}]}]}
+
+
+class GeminiClientTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = gemini_stub.serve()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        gemini_stub.GeminiStub.delay = 0.0
+        gemini_stub.GeminiStub.fail_next = 0
+        gemini_stub.GeminiStub.calls = 0
+
+    def client(self, **options):
+        return GeminiClient(api_key="test", base_url=self.base_url, model="stub", **options)
+
+    def test_5xx_answers_are_retried(self):
+        gemini_stub.GeminiStub.fail_next = 1
+        gen, status_code = self.client(retries=2).generate(PAYLOAD)
+        self.assertEqual(status_code, 200)
+        self.assertIn("candidates", gen)
+        self.assertEqual(gemini_stub.GeminiStub.calls, 2)
+
+    def test_retries_are_bounded(self):
+        gemini_stub.GeminiStub.fail_next = 10
+        _, status_code = self.client(retries=2).generate(PAYLOAD)
+        self.assertEqual(status_code, 503)
+        self.assertEqual(gemini_stub.GeminiStub.calls, 3)
+
+    def test_read_timeout(self):
+        gemini_stub.GeminiStub.delay = 2.0
+        start = time.perf_counter()
+        # urllib3's retry wrapper turns the read timeout into a ConnectionError
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.client(read_timeout=0.2, retries=0).generate(PAYLOAD)
+        self.assertLess(time.perf_counter() - start, 1.5)
+
+    def test_busy_slots_answer_503(self):
+        gemini_stub.GeminiStub.delay = 1.0
+        busy = self.client(max_concurrency=1, queue_timeout=0.05)
+        previous, app.gemini = app.gemini, busy
+        try:
+            pending = busy.submit(PAYLOAD)
+            client = app.app.test_client()
+
+            image = base64.b64encode(os.urandom(64)).decode("ascii")
+            response = client.post("/detectDisease", json={"image_base64": image})
+            self.assertEqual(response.status_code, 503)
+
+            response = client.post("/fertCalculator", json={"crop": f"Crop {uuid.uuid4().hex}"})
+            self.assertEqual(response.status_code, 503)
+            pending.result()
+        finally:
+            app.gemini = previous
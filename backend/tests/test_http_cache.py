@@ -0,0 +1,56 @@
+"""
+ETags of the compressed variants of cached GET responses, and the JSON 400 of
+/pastPrices and /pastDemand for a missing or non-numeric year or month. Run from the
+backend/ folder:
+    python -m pytest tests
+"""
+import unittest
+
+from support import app
+import http_cache
+
+URL = "/pastPrices?state=Punjab&crop=Wheat&year=2024&month=5"
+
+
+class VariantETagTest(unittest.TestCase):
+    def setUp(self):
+        # Compress the small test bodies too
+        self.previous = http_cache.MIN_COMPRESS_BYTES
+        http_cache.MIN_COMPRESS_BYTES = 0
+        self.client = app.app.test_client()
+
+    def tearDown(self):
+        http_cache.MIN_COMPRESS_BYTES = self.previous
+
+    def get(self, accept_encoding, if_none_match=None):
+        headers = {"Accept-Encoding": accept_encoding}
+        if if_none_match:
+            headers["If-None-Match"] = if_none_match
+        return self.client.get(URL, headers=headers)
+
+    def test_each_encoding_has_its_own_etag(self):
+        etags = {encoding: self.get(encoding).headers["ETag"] for encoding in ("identity", "gzip", "br")}
+        self.assertEqual(len(set(etags.values())), 3)
+        self.assertTrue(etags["gzip"].endswith('-gzip"'))
+        self.assertTrue(etags["br"].endswith('-br"'))
+
+    def test_not_modified_only_for_the_same_encoding(self):
+        gzip_etag = self.get("gzip").headers["ETag"]
+        self.assertEqual(self.get("gzip", gzip_etag).status_code, 304)
+        self.assertEqual(self.get("br", gzip_etag).status_code, 200)
+        self.assertEqual(self.get("identity", gzip_etag).status_code, 200)
+
+
+class PastMonthsParamsTest(unittest.TestCase):
+    def setUp(self):
+        self.client = app.app.test_client()
+
+    def test_missing_or_non_numeric_year_month(self):
+        for route in ("/pastPrices", "/pastDemand"):
+            for query in ("", "&year=2024", "&year=x&month=5", "&year=2024&month=may"):
+                response = self.client.get(f"{route}?state=Punjab&crop=Wheat{query}")
+                self.assertEqual(response.status_code, 400, (route, query))
+                self.assertEqual(response.json, {"error": "Missing required fields"})
+
+            response = self.client.post(route, json={"state": "Punjab", "crop": "Wheat", "month": 5})
+            self.assertEqual(response.status_code, 400)
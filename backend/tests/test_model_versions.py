@@ -0,0 +1,61 @@
+"""
+Switching model versions (model_training/incremental_train.py) in a running app. The
+version folder links to the artifacts of the backend/ folder, so run from it:
+    python -m pytest tests
+"""
+import glob
+import os
+import shutil
+import tempfile
+import unittest
+
+from support import app
+
+
+class ModelVersionTest(unittest.TestCase):
+    def setUp(self):
+        self.model_dir = tempfile.mkdtemp(prefix="krishi_models_")
+        os.makedirs(os.path.join(self.model_dir, "v2"))
+        for path in glob.glob("*.pkl") + glob.glob("*.flat.*"):
+            os.symlink(os.path.abspath(path), os.path.join(self.model_dir, "v2", path))
+        self.previous_model_dir, app.MODEL_DIR = app.MODEL_DIR, self.model_dir
+        self.client = app.app.test_client()
+
+    def tearDown(self):
+        app.activate_model_version(None)
+        app.MODEL_DIR = self.previous_model_dir
+        shutil.rmtree(self.model_dir)
+
+    def predict(self):
+        # Past the forecast table, so the models run and their outputs are memoized
+        response = self.client.post("/predict", json={
+            "state": "Bihar", "crop": "Wheat", "startYear": 2040, "startMonth": 1, "endYear": 2040, "endMonth": 2
+        })
+        self.assertEqual(response.status_code, 200)
+
+    def test_version_changes_after_every_artifact_is_swapped(self):
+        app.le_state.load()
+        seen = []
+        reload = app.le_state.reload
+        app.le_state.reload = lambda: (seen.append(app.model_version), reload())
+        try:
+            app.activate_model_version("v2")
+        finally:
+            del app.le_state.reload
+
+        self.assertEqual(seen, [None])
+        self.assertEqual(app.model_version, "v2")
+
+    def test_predictions_are_cached_per_version(self):
+        app.prediction_cache.clear()
+        self.predict()
+        self.assertIsNot(app.prediction_cache.get((None, "price", "Bihar", "Wheat", 2040, 1)), app.MISSING)
+
+        # A prediction of the old models stored after the switch is not served as the new version's
+        app.activate_model_version("v2")
+        app.prediction_cache.set((None, "price", "Bihar", "Wheat", 2040, 1), -1.0)
+        self.assertIs(app.lookup_prediction(("price", "Bihar", "Wheat", 2040, 1), app.model_version), app.MISSING)
+
+
+if __name__ == "__main__":
+    unittest.main()
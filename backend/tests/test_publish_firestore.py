@@ -0,0 +1,70 @@
+"""
+model_training/publish_firestore.py against the in-memory Firestore of
+benchmarks/firestore_fake.py: reruns, resuming from the checkpoint and months going from
+forecast to data. Run from the backend/ folder:
+    python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import unittest
+
+from support import firestore_fake
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "model_training"))
+from publish_firestore import publish  # noqa: E402
+
+
+def documents(count, forecast=False):
+    data = {"price": 1.0, "demand": 2.0, "forecast": True} if forecast else {"price": 5.0}
+    return [("Punjab", "Wheat", f"{month:02d}-2024", dict(data)) for month in range(1, count + 1)]
+
+
+class FailingFirestore(firestore_fake.FakeFirestore):
+    """Fails every commit after the first fail_after ones, like a loader that gets killed."""
+
+    def __init__(self, fail_after):
+        super().__init__()
+        self.fail_after = fail_after
+
+    def _round_trip(self):
+        if self.commits >= self.fail_after:
+            raise RuntimeError("connection lost")
+        super()._round_trip()
+
+
+class PublishTest(unittest.TestCase):
+    def setUp(self):
+        self.checkpoint = os.path.join(tempfile.mkdtemp(prefix="krishi_publish_"), "checkpoint.json")
+
+    def month(self, db, db_month):
+        return db.documents.get(("crop_data", "Punjab", "Wheat", db_month))
+
+    def test_rerun_writes_the_same_documents(self):
+        db = firestore_fake.FakeFirestore()
+        self.assertEqual(publish(db, documents(5), batch_size=2, rate=1e9), 5)
+        first = dict(db.documents)
+        self.assertEqual(publish(db, documents(5), batch_size=2, rate=1e9), 5)
+        self.assertEqual(db.documents, first)
+
+    def test_resumes_after_the_checkpoint(self):
+        db = FailingFirestore(fail_after=2)
+        with self.assertRaises(RuntimeError):
+            publish(db, documents(5), batch_size=2, rate=1e9, checkpoint=self.checkpoint)
+        self.assertEqual(len(db.documents), 4)
+
+        db.fail_after = float("inf")
+        self.assertEqual(publish(db, documents(5), batch_size=2, rate=1e9, checkpoint=self.checkpoint), 1)
+        self.assertEqual(db.commits, 3)
+        self.assertEqual(self.month(db, "05-2024"), {"price": 5.0})
+
+        # Another plan starts over
+        self.assertEqual(publish(db, documents(6), batch_size=2, rate=1e9, checkpoint=self.checkpoint), 6)
+
+    def test_forecast_month_is_replaced_by_data(self):
+        db = firestore_fake.FakeFirestore()
+        publish(db, documents(3, forecast=True), rate=1e9)
+        self.assertEqual(self.month(db, "02-2024"), {"price": 1.0, "demand": 2.0, "forecast": True})
+
+        publish(db, documents(3), rate=1e9)
+        self.assertEqual(self.month(db, "02-2024"), {"price": 5.0})
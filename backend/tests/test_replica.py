@@ -0,0 +1,67 @@
+"""
+CropDataReplica against the in-memory Firestore of benchmarks/firestore_fake.py.
+Run from the backend/ folder:
+    python -m pytest tests
+"""
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+import firestore_fake  # noqa: E402
+
+from replica import CropDataReplica  # noqa: E402
+
+
+class ReplicaTest(unittest.TestCase):
+    def setUp(self):
+        self.client = firestore_fake.FakeFirestore()
+        self.client.documents[("crop_data", "Bihar", "Wheat", "01-2024")] = {"price": 2000.0}
+        self.client.documents[("crop_data", "Bihar", "Wheat", "02-2024")] = {"price": 2100.0}
+        self.client.documents[("crop_data", "Punjab", "Maize", "01-2024")] = {"price": 1500.0}
+        self.replica = CropDataReplica(self.client, max_lag_seconds=0.5)
+
+    def sync(self):
+        self.replica.sync()
+        deadline = time.time() + 2
+        while self.replica._pending and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_loads_every_crop_collection(self):
+        self.sync()
+
+        self.assertTrue(self.replica.fresh())
+        self.assertEqual(self.replica.crops("Bihar"), ["Wheat"])
+        self.assertEqual(self.replica.get("Punjab", [("Maize", "01-2024")]), {("Maize", "01-2024"): {"price": 1500.0}})
+
+    def test_dead_listener_is_replaced_and_reloaded(self):
+        self.sync()
+        watch = self.replica._watches[("Bihar", "Wheat")]
+
+        # Writes the dead listener never delivers
+        watch.is_active = False
+        del self.client.documents[("crop_data", "Bihar", "Wheat", "02-2024")]
+        self.client.documents[("crop_data", "Bihar", "Wheat", "01-2024")] = {"price": 2500.0}
+        self.sync()
+
+        self.assertEqual(self.replica.stats()["resubscribes"], 1)
+        self.assertIsNot(self.replica._watches[("Bihar", "Wheat")], watch)
+        self.assertEqual(self.replica.get("Bihar", [("Wheat", "01-2024"), ("Wheat", "02-2024")]), {
+            ("Wheat", "01-2024"): {"price": 2500.0}, ("Wheat", "02-2024"): None
+        })
+        self.assertTrue(self.replica.fresh())
+
+    def test_lag_grows_without_confirmed_listeners(self):
+        self.sync()
+        self.assertLess(self.replica.lag_seconds(), 0.5)
+
+        # No snapshot and no sync confirms the listeners (e.g. Firestore is unreachable)
+        time.sleep(0.6)
+
+        self.assertGreater(self.replica.lag_seconds(), 0.5)
+        self.assertFalse(self.replica.fresh())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+Size cap of /detectDisease/upload, for uploads with and without a Content-Length, in
+the Flask app and in async mode. Run from the backend/ folder:
+    python -m pytest tests
+"""
+import asyncio
+import io
+import unittest
+
+import httpx
+
+from support import app
+import asgi
+
+LIMIT = 64 * 1024
+
+
+class UploadLimitTest(unittest.TestCase):
+    def setUp(self):
+        self.previous = app.MAX_UPLOAD_BYTES
+        app.MAX_UPLOAD_BYTES = LIMIT
+        self.client = app.app.test_client()
+
+    def tearDown(self):
+        app.MAX_UPLOAD_BYTES = self.previous
+
+    def chunked_post(self, body, content_type):
+        # No Content-Length: the server reads until the chunked body ends
+        return self.client.post(
+            "/detectDisease/upload", input_stream=io.BytesIO(body), content_type=content_type,
+            environ_overrides={"wsgi.input_terminated": True, "CONTENT_LENGTH": ""}
+        )
+
+    def test_chunked_raw_upload_is_capped(self):
+        response = self.chunked_post(b"\xff" * (2 * LIMIT), "image/jpeg")
+        self.assertEqual(response.status_code, 413)
+
+    def test_chunked_multipart_upload_is_capped(self):
+        body = (
+            b"--x\r\nContent-Disposition: form-data; name=\"image\"; filename=\"leaf.jpg\"\r\n"
+            b"Content-Type: image/jpeg\r\n\r\n" + b"\xff" * (2 * LIMIT) + b"\r\n--x--\r\n"
+        )
+        response = self.chunked_post(body, "multipart/form-data; boundary=x")
+        self.assertEqual(response.status_code, 413)
+
+    def test_small_invalid_upload_is_read(self):
+        response = self.chunked_post(b"not an image", "image/jpeg")
+        self.assertEqual(response.status_code, 400)
+
+    def test_json_routes_are_not_capped(self):
+        # Read whole and rejected for its content, not its size
+        response = self.client.post("/detectDisease", json={"image_base64": "*" * (2 * LIMIT)})
+        self.assertEqual(response.status_code, 400)
+
+    def asgi_post(self, body, content_type):
+        async def chunks():
+            for start in range(0, len(body), 8192):
+                yield body[start:start + 8192]
+
+        async def post():
+            transport = httpx.ASGITransport(app=asgi.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post(
+                    "/detectDisease/upload", content=chunks(), headers={"Content-Type": content_type}
+                )
+
+        return asyncio.run(post())
+
+    def test_async_chunked_uploads_are_capped(self):
+        self.assertEqual(self.asgi_post(b"\xff" * (2 * LIMIT), "image/jpeg").status_code, 413)
+        body = (
+            b"--x\r\nContent-Disposition: form-data; name=\"image\"; filename=\"leaf.jpg\"\r\n"
+            b"Content-Type: image/jpeg\r\n\r\n" + b"\xff" * (2 * LIMIT) + b"\r\n--x--\r\n"
+        )
+        self.assertEqual(self.asgi_post(body, "multipart/form-data; boundary=x").status_code, 413)
+        self.assertEqual(self.asgi_post(b"not an image", "image/jpeg").status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
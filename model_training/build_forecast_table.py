@@ -0,0 +1,112 @@
+"""
+Precomputes price and demand forecasts for every state x crop x month of a horizon.
+
+Needs the .pkl files written by price_model.py, demand_model.py and climatology.py.
+Writes forecast_prices.npy, forecast_demand.npy (float64, shape states x crops x months)
+and forecast_meta.json; copy them next to the backend's .pkl files. --dir reads the
+models from and writes the table into a model version folder of incremental_train.py.
+
+    python build_forecast_table.py --start 2022-01 --months 120
+    python build_forecast_table.py --dir models/20250301-120000
+"""
+import argparse
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--start", default="2022-01", help="first month of the horizon (YYYY-MM)")
+parser.add_argument("--months", type=int, default=120, help="number of months in the horizon")
+parser.add_argument("--dir", default=".", help="folder of the models and of the output")
+args = parser.parse_args()
+
+start_year, start_month = (int(part) for part in args.start.split("-"))
+
+# 1. Load models, encoders and features
+model = joblib.load(os.path.join(args.dir, "price_model.pkl"))
+le_crop = joblib.load(os.path.join(args.dir, "crop_encoder.pkl"))
+le_state = joblib.load(os.path.join(args.dir, "state_encoder.pkl"))
+demand_model = joblib.load(os.path.join(args.dir, "demand_model.pkl"))
+scaler = joblib.load(os.path.join(args.dir, "scalers.pkl"))
+label_encoders = joblib.load(os.path.join(args.dir, "label_encoder.pkl"))
+climatology = joblib.load("climatology.pkl")
+
+
+def lookup(table, **keys):
+    """Same fallback lookup as ClimatologyFeatureProvider in the backend."""
+    for level in table["levels"]:
+        row = table["tables"][level].get(tuple(keys[name] for name in level))
+        if row is not None:
+            return row
+    raise KeyError(keys)
+
+
+def encode(label_encoder, value):
+    """Label code, or 0 for labels the demand model has not seen (like safe_encode in the backend)."""
+    classes = list(label_encoder.classes_)
+    return classes.index(value) if value in classes else 0
+
+
+# 2. One row per (state, crop, month), in C order of the output tensor
+states, crops = list(le_state.classes_), list(le_crop.classes_)
+months = [
+    (start_year + (start_month - 1 + i) // 12, (start_month - 1 + i) % 12 + 1)
+    for i in range(args.months)
+]
+grid = [
+    (s, c, year, month)
+    for s in range(len(states))
+    for c in range(len(crops))
+    for year, month in months
+]
+shape = (len(states), len(crops), len(months))
+
+# 3. Price forecasts
+price_rows = []
+for s, c, year, month in grid:
+    weather = lookup(climatology["weather"], state=states[s], month=month)
+    price_rows.append([
+        s, c, year, month,
+        weather["temperature"],
+        weather["rainfall"],
+        weather["soil_moisture"],
+        weather["ndvi"]
+    ])
+prices = model.predict(np.array(price_rows))
+
+# 4. Demand forecasts, using the predicted price as the backend does when no price is stored
+demand_rows = []
+for (s, c, year, month), price in zip(grid, prices):
+    market = lookup(climatology["market"], state=states[s], crop=crops[c], month=month)
+    demand_rows.append({
+        "state": encode(label_encoders["state"], states[s]),
+        "crop": encode(label_encoders["crop"], crops[c]),
+        "year": year,
+        "month": month,
+        "seasonality": market["seasonality"],
+        "special_event": market["special_event"],
+        "price": round(price, 2),
+        "marketing_spend": market["marketing_spend"],
+        "competitor_price": market["competitor_price"],
+        "supply": market["supply"]
+    })
+demand_df = pd.DataFrame(demand_rows)
+num_cols = ["price", "marketing_spend", "competitor_price", "supply"]
+demand_df[num_cols] = scaler.transform(demand_df[num_cols])
+demand = demand_model.predict(demand_df.reindex(columns=demand_model.feature_names_in_))
+
+# 5. Persist
+np.save(os.path.join(args.dir, "forecast_prices.npy"), prices.reshape(shape))
+np.save(os.path.join(args.dir, "forecast_demand.npy"), demand.reshape(shape))
+with open(os.path.join(args.dir, "forecast_meta.json"), "w") as f:
+    json.dump({
+        "states": states,
+        "crops": crops,
+        "start_year": start_year,
+        "start_month": start_month,
+        "months": len(months)
+    }, f, indent=2)
+print(f"✅ Forecast table saved! ({shape[0]} states x {shape[1]} crops x {shape[2]} months)")
@@ -0,0 +1,67 @@
+import math
+
+import joblib
+
+from data_store import load_table
+
+# Weather features of the price model and market features of the demand model
+WEATHER_COLS = ["temperature", "rainfall", "soil_moisture", "ndvi"]
+MARKET_COLS = ["seasonality", "marketing_spend", "competitor_price", "special_event", "supply"]
+
+# Lookup levels, most specific first. The backend falls back to the next level
+# when a key is missing, down to the overall average.
+WEATHER_LEVELS = [("state", "month"), ("month",), ()]
+MARKET_LEVELS = [("state", "crop", "month"), ("crop", "month"), ("month",), ()]
+
+
+def monthly_averages(df, cols, levels):
+    """Returns {level: {key tuple: {column: average}}} for every lookup level."""
+    tables = {}
+    for level in levels:
+        if level:
+            means = df.groupby(list(level))[cols].mean()
+        else:
+            means = df[cols].mean().to_frame().T
+        if "special_event" in cols:
+            means["special_event"] = (means["special_event"] >= 0.5).astype(int)
+
+        tables[level] = {
+            (key if isinstance(key, tuple) else (key,)) if level else (): row
+            for key, row in zip(means.index, means.to_dict("records"))
+        }
+    return fill_missing(tables, levels)
+
+
+def fill_missing(tables, levels):
+    """Replaces every NaN average with the value of the first coarser level that has one.
+
+    A column can be NaN in all rows of a key (e.g. the July temperatures of a state),
+    and the backend serves the features as they are, so no average may stay NaN.
+    """
+    for i, level in enumerate(levels):
+        for key, row in tables[level].items():
+            names = dict(zip(level, key))
+            for col, value in row.items():
+                if not math.isnan(value):
+                    continue
+                for coarser in levels[i + 1:]:
+                    fallback = tables[coarser].get(tuple(names[name] for name in coarser), {}).get(col, math.nan)
+                    if not math.isnan(fallback):
+                        row[col] = fallback
+                        break
+    return tables
+
+
+# 1. Load data (columnar stores of the CSVs, with the calendar month already derived)
+prices = load_table("prices", ["state", "month"] + WEATHER_COLS)
+demand = load_table("demand", ["state", "crop", "month"] + MARKET_COLS)
+
+# 2. Averages per state / crop / calendar month
+climatology = {
+    "weather": {"levels": WEATHER_LEVELS, "tables": monthly_averages(prices, WEATHER_COLS, WEATHER_LEVELS)},
+    "market": {"levels": MARKET_LEVELS, "tables": monthly_averages(demand, MARKET_COLS, MARKET_LEVELS)},
+}
+
+# 3. Persist
+joblib.dump(climatology, "climatology.pkl")
+print("✅ Climatology features saved!")
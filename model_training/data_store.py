@@ -0,0 +1,135 @@
+"""
+Columnar store of the training CSVs, one memory-mapped NumPy column per file:
+
+    data/<table>/meta.json     row count, column dtypes and label dictionaries
+    data/<table>/<column>.bin  raw values of the column
+
+crop, state and location are dictionary-encoded as int32 codes (the dictionary only
+grows, so codes never change), dates are stored as datetime64 next to precomputed month
+and year columns. Appending writes the new rows at the end of every column file and
+then updates the row count in meta.json, so readers never see half-written rows.
+Readers map the columns without parsing or copying them.
+
+    python data_store.py                                              # ingest both CSVs
+    python data_store.py --table prices --csv new_prices.csv --append
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+TABLES = {"prices": "final_prices.csv", "demand": "demand_crops.csv"}
+DATA_DIR = "data"
+TEXT_COLUMNS = ["crop", "state", "location"]
+
+
+def table_path(table):
+    return os.path.join(DATA_DIR, table)
+
+
+def read_meta(path):
+    with open(os.path.join(path, "meta.json")) as f:
+        return json.load(f)
+
+
+def write_meta(path, meta):
+    # Replaced atomically: the row count only covers fully written rows
+    with open(os.path.join(path, "meta.json.tmp"), "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(os.path.join(path, "meta.json.tmp"), os.path.join(path, "meta.json"))
+
+
+def csv_columns(csv_path, dictionaries):
+    """Typed columns of a CSV, in its column order plus month and year; extends dictionaries."""
+    df = pd.read_csv(csv_path)
+    dates = pd.to_datetime(df["date"])
+    columns = {}
+    for name in df.columns:
+        if name in TEXT_COLUMNS:
+            labels = dictionaries.setdefault(name, [])
+            codes = {label: code for code, label in enumerate(labels)}
+            for label in df[name].unique():
+                if label not in codes:
+                    codes[label] = len(labels)
+                    labels.append(label)
+            columns[name] = df[name].map(codes).to_numpy(np.int32)
+        elif name == "date":
+            columns[name] = dates.to_numpy("datetime64[ns]")
+        else:
+            columns[name] = df[name].to_numpy()
+    columns["month"] = dates.dt.month.to_numpy(np.int32)
+    columns["year"] = dates.dt.year.to_numpy(np.int32)
+    return columns
+
+
+def ingest(table, csv_path, append=False):
+    """Writes the rows of csv_path to the table, replacing it unless append is set."""
+    path = table_path(table)
+    meta = read_meta(path) if append else {"rows": 0, "columns": {}, "dictionaries": {}}
+    columns = csv_columns(csv_path, meta["dictionaries"])
+    if append and list(columns) != list(meta["columns"]):
+        raise ValueError(f"{csv_path} has columns {list(columns)}, {table} has {list(meta['columns'])}")
+
+    os.makedirs(path, exist_ok=True)
+    n_rows = len(next(iter(columns.values())))
+    for name, values in columns.items():
+        dtype = np.dtype(meta["columns"].setdefault(name, values.dtype.str))
+        with open(os.path.join(path, f"{name}.bin"), "ab" if append else "wb") as f:
+            # Drop the tail of an append that failed before meta.json was updated
+            f.truncate(meta["rows"] * dtype.itemsize)
+            f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+    meta["rows"] += n_rows
+    write_meta(path, meta)
+    return n_rows
+
+
+class ColumnStore:
+    """Read access to a table written by ingest()."""
+
+    def __init__(self, path):
+        meta = read_meta(path)
+        self.path = path
+        self.rows = meta["rows"]
+        self.dtypes = {name: np.dtype(dtype) for name, dtype in meta["columns"].items()}
+        self.dictionaries = {name: np.array(labels, dtype=object) for name, labels in meta["dictionaries"].items()}
+
+    def column(self, name):
+        """Memory-mapped values of a column (the codes of a text column)."""
+        if self.rows == 0:
+            return np.empty(0, dtype=self.dtypes[name])
+        return np.memmap(os.path.join(self.path, f"{name}.bin"), dtype=self.dtypes[name], mode="r", shape=(self.rows,))
+
+    def labels(self, name):
+        """Decoded values of a text column."""
+        return self.dictionaries[name][self.column(name)]
+
+    def frame(self, columns=None):
+        """DataFrame of the given columns (all by default), with text columns decoded."""
+        return pd.DataFrame({
+            name: self.labels(name) if name in self.dictionaries else self.column(name)
+            for name in columns or self.dtypes
+        })
+
+
+def load_table(table, columns=None):
+    """DataFrame of a table, ingesting its CSV first if the store does not exist yet."""
+    path = table_path(table)
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        print(f"Ingesting {TABLES[table]} into {path}...")
+        ingest(table, TABLES[table])
+    return ColumnStore(path).frame(columns)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--table", choices=sorted(TABLES), help="table to write (default: both, from their CSVs)")
+    parser.add_argument("--csv", help="CSV to read (default: the table's training CSV)")
+    parser.add_argument("--append", action="store_true", help="add the rows instead of replacing the table")
+    args = parser.parse_args()
+
+    for table in [args.table] if args.table else sorted(TABLES):
+        n_rows = ingest(table, args.csv or TABLES[table], append=args.append)
+        print(f"✅ {table}: {n_rows} rows {'appended' if args.append else 'written'}, "
+              f"{ColumnStore(table_path(table)).rows} in total")
@@ -1,18 +1,15 @@
-import pandas as pd
 import joblib
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error, root_mean_squared_error, r2_score
+from data_store import load_table
 
 
-# 1. Load data
-df = pd.read_csv("demand_crops.csv")
+# 1. Load data (columnar store of demand_crops.csv)
+df = load_table("demand")
 
-# 2. Date handling ➜ month / year
-df["date"] = pd.to_datetime(df["date"])
-df["month"] = df["date"].dt.month
-df["year"]  = df["date"].dt.year
+# 2. Month / year come precomputed with the dates
 df.drop(columns=["date", "location"], inplace=True)
 
 # 3. Encode categorical features
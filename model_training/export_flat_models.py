@@ -0,0 +1,113 @@
+"""
+Exports the trained forests into a flat, memory-mappable node format for the backend.
+
+For every <name>.pkl this writes:
+    <name>.flat.npy   one structured record per node of every tree
+                      (feature, threshold, left, right, missing_left, value)
+    <name>.flat.json  tree roots, depth and feature names
+
+Child indexes are global across the forest and leaves point to themselves, so the
+backend can walk all trees at once for a fixed number of steps. missing_left keeps the
+side each split learned for NaN features. After the export, the flat forest is checked
+against the pickled one on rows with and without NaN.
+
+    python export_flat_models.py
+"""
+import json
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+
+MODELS = ["price_model", "demand_model"]
+
+NODE_DTYPE = np.dtype([
+    ("feature", np.int32),
+    ("threshold", np.float64),
+    ("left", np.int32),
+    ("right", np.int32),
+    ("missing_left", np.bool_),
+    ("value", np.float64),
+])
+
+
+def flatten(forest):
+    """Returns (nodes, roots, max_depth) for a fitted RandomForestRegressor."""
+    total = sum(tree.tree_.node_count for tree in forest.estimators_)
+    nodes = np.empty(total, dtype=NODE_DTYPE)
+    roots = []
+
+    offset = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        count = tree.node_count
+        index = np.arange(offset, offset + count, dtype=np.int32)
+        is_leaf = tree.children_left == -1
+
+        block = nodes[offset:offset + count]
+        block["feature"] = np.where(is_leaf, 0, tree.feature)
+        block["threshold"] = np.where(is_leaf, np.inf, tree.threshold)
+        block["left"] = np.where(is_leaf, index, tree.children_left + offset)
+        block["right"] = np.where(is_leaf, index, tree.children_right + offset)
+        block["missing_left"] = ~is_leaf & (tree.missing_go_to_left == 1)
+        block["value"] = tree.value[:, 0, 0]
+
+        roots.append(offset)
+        offset += count
+
+    max_depth = max(estimator.tree_.max_depth for estimator in forest.estimators_)
+    return nodes, roots, max_depth
+
+
+def export(forest, prefix):
+    """Writes <prefix>.flat.npy and <prefix>.flat.json for a fitted forest."""
+    nodes, roots, max_depth = flatten(forest)
+
+    np.save(f"{prefix}.flat.npy", nodes)
+    with open(f"{prefix}.flat.json", "w") as f:
+        json.dump({
+            "roots": roots,
+            "max_depth": int(max_depth),
+            "n_features": int(forest.n_features_in_),
+            "feature_names": [str(col) for col in getattr(forest, "feature_names_in_", [])]
+        }, f)
+    return nodes, roots
+
+
+def check(forest, prefix, rows=500, seed=0):
+    """Raises if the export under prefix predicts differently from forest.
+
+    Rows are drawn from the split thresholds of the forest, one in three values NaN.
+    """
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+    from flat_forest import FlatForest
+
+    rng = np.random.default_rng(seed)
+    X = np.empty((rows, forest.n_features_in_))
+    for feature in range(forest.n_features_in_):
+        thresholds = np.concatenate([
+            estimator.tree_.threshold[estimator.tree_.feature == feature] for estimator in forest.estimators_
+        ])
+        thresholds = thresholds[np.isfinite(thresholds)]
+        X[:, feature] = rng.choice(thresholds, rows) + rng.normal(0, 1e-3, rows) if len(thresholds) else 0.0
+    X[rng.random(X.shape) < 1 / 3] = np.nan
+
+    if hasattr(forest, "feature_names_in_"):
+        X = pd.DataFrame(X, columns=forest.feature_names_in_)
+    expected = forest.predict(X)
+    difference = np.abs(FlatForest(prefix).predict(X) - expected).max()
+    if difference > 1e-6 * max(1.0, np.abs(expected).max()):
+        raise ValueError(f"{prefix}: the flat export differs from the forest by up to {difference}")
+
+
+if __name__ == "__main__":
+    for name in MODELS:
+        forest = joblib.load(f"{name}.pkl")
+        if not hasattr(forest, "estimators_"):
+            print(f"⚠ {name} is not a random forest, the backend will load its .pkl")
+            continue
+        nodes, roots = export(forest, name)
+        check(forest, name)
+        print(f"✅ {name}: {len(roots)} trees, {len(nodes)} nodes, {nodes.nbytes / 1e6:.1f} MB")
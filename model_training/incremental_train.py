@@ -0,0 +1,181 @@
+"""
+Updates the price and demand forests with new rows and saves them as a new model version
+that the backend switches to without a restart.
+
+The new rows are CSVs with the columns of final_prices.csv / demand_crops.csv (--since
+keeps only the rows from that month on, so the full, grown CSV can be passed as well).
+Each updated forest keeps all of its trees and grows --new-trees more on the new rows
+(warm_start). Label encoders keep the codes of known labels and append unseen labels at
+the end, and the demand scaler is reused as it is, so the existing trees keep getting
+the inputs they were trained on.
+
+Versions are folders models/<version>/ holding every artifact the backend loads (the
+ones of a model that was not updated are copied over), the flat export of the forests
+and manifest.json. models/CURRENT names the active version; the first update starts
+from the .pkl files of this folder.
+
+    python incremental_train.py --prices new_prices.csv --demand new_demand.csv --new-trees 20
+    python incremental_train.py --prices final_prices.csv --since 2025-01
+"""
+import argparse
+import json
+import os
+import shutil
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error
+
+from export_flat_models import check, export
+
+PRICE_FEATURES = ['state_encoded', 'crop_encoded', 'year', 'month', 'temperature', 'rainfall', 'soil_moisture', 'ndvi']
+NUM_COLS = ["price", "marketing_spend", "competitor_price", "supply"]
+
+# Artifacts of each model, as the backend loads them
+MODEL_FILES = {
+    "price_model": ["price_model.pkl", "price_model.flat.npy", "price_model.flat.json",
+                    "crop_encoder.pkl", "state_encoder.pkl"],
+    "demand_model": ["demand_model.pkl", "demand_model.flat.npy", "demand_model.flat.json",
+                     "scalers.pkl", "label_encoder.pkl"],
+}
+
+
+def read_new_rows(path, since):
+    """Rows of the CSV at path with month and year columns, from the month since (YYYY-MM) on."""
+    df = pd.read_csv(path)
+    df["date"] = pd.to_datetime(df["date"])
+    if since:
+        df = df[df["date"] >= pd.Timestamp(f"{since}-01")]
+    df["month"] = df["date"].dt.month
+    df["year"] = df["date"].dt.year
+    return df
+
+
+def extend_encoder(encoder, labels):
+    """Appends the labels the encoder has not seen to classes_; known labels keep their code."""
+    known = set(encoder.classes_)
+    unseen = sorted({label for label in labels if label not in known})
+    if unseen:
+        encoder.classes_ = np.concatenate([encoder.classes_, np.array(unseen, dtype=encoder.classes_.dtype)])
+    return unseen
+
+
+def encode(encoder, labels):
+    # Same label -> code mapping as the backend, which also works with appended labels
+    codes = {label: code for code, label in enumerate(encoder.classes_)}
+    return labels.map(codes)
+
+
+def grow(forest, X, y, new_trees):
+    """Adds new_trees trees fitted on (X, y) to the forest, keeping the existing ones."""
+    if not hasattr(forest, "estimators_"):
+        # Warm-started gradient boosting re-bins on the new rows only, which breaks the existing trees
+        raise SystemExit(f"{type(forest).__name__} can't be updated incrementally, retrain it with model_search.py")
+    before = mean_absolute_error(y, forest.predict(X))
+    forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + new_trees)
+    forest.fit(X, y)
+    forest.set_params(warm_start=False)
+    after = mean_absolute_error(y, forest.predict(X))
+    print(f"   MAE on the new rows: {before:.2f} -> {after:.2f} ({len(forest.estimators_)} trees)")
+
+
+def update_price_model(base, df, new_trees):
+    model = joblib.load(os.path.join(base, "price_model.pkl"))
+    le_crop = joblib.load(os.path.join(base, "crop_encoder.pkl"))
+    le_state = joblib.load(os.path.join(base, "state_encoder.pkl"))
+
+    new_labels = {"crop": extend_encoder(le_crop, df["crop"]), "state": extend_encoder(le_state, df["state"])}
+    df["crop_encoded"] = encode(le_crop, df["crop"])
+    df["state_encoded"] = encode(le_state, df["state"])
+
+    grow(model, df[PRICE_FEATURES], df["price"], new_trees)
+    artifacts = {"price_model.pkl": model, "crop_encoder.pkl": le_crop, "state_encoder.pkl": le_state}
+    return model, artifacts, new_labels
+
+
+def update_demand_model(base, df, new_trees):
+    model = joblib.load(os.path.join(base, "demand_model.pkl"))
+    scaler = joblib.load(os.path.join(base, "scalers.pkl"))
+    label_encoders = joblib.load(os.path.join(base, "label_encoder.pkl"))
+
+    new_labels = {}
+    for col in ["crop", "state"]:
+        labels = df[col].astype(str)
+        new_labels[col] = extend_encoder(label_encoders[col], labels)
+        df[col] = encode(label_encoders[col], labels)
+
+    # The scaler stays as fitted on the full training data
+    df[NUM_COLS] = scaler.transform(df[NUM_COLS])
+    grow(model, df.reindex(columns=model.feature_names_in_), df["demand"], new_trees)
+    artifacts = {"demand_model.pkl": model, "scalers.pkl": scaler, "label_encoder.pkl": label_encoders}
+    return model, artifacts, new_labels
+
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--prices", help="CSV of new price rows (columns of final_prices.csv)")
+parser.add_argument("--demand", help="CSV of new demand rows (columns of demand_crops.csv)")
+parser.add_argument("--since", help="only use rows from this month on (YYYY-MM)")
+parser.add_argument("--new-trees", type=int, default=20, help="trees added to each updated forest")
+parser.add_argument("--models-dir", default="models", help="folder of the model versions")
+parser.add_argument("--version", default=datetime.now().strftime("%Y%m%d-%H%M%S"), help="name of the new version")
+parser.add_argument("--no-activate", action="store_true", help="write the version without pointing CURRENT at it")
+args = parser.parse_args()
+
+if not args.prices and not args.demand:
+    parser.error("pass --prices and/or --demand")
+
+# 1. Start from the active version, or from the artifacts of this folder
+current_path = os.path.join(args.models_dir, "CURRENT")
+parent = open(current_path).read().strip() if os.path.exists(current_path) else None
+base = os.path.join(args.models_dir, parent) if parent else "."
+out = os.path.join(args.models_dir, args.version)
+if os.path.exists(out):
+    raise SystemExit(f"Version {args.version} already exists")
+
+# 2. Grow the forests on the new rows
+updates = {}
+for name, path, update in (("price_model", args.prices, update_price_model),
+                           ("demand_model", args.demand, update_demand_model)):
+    if not path:
+        continue
+    df = read_new_rows(path, args.since)
+    if df.empty:
+        print(f"⚠ No new rows for {name}, keeping it as it is.")
+        continue
+    print(f"🌱 {name}: {len(df)} new rows")
+    model, artifacts, new_labels = update(base, df, args.new_trees)
+    os.makedirs(out, exist_ok=True)
+    for filename, artifact in artifacts.items():
+        joblib.dump(artifact, os.path.join(out, filename))
+    export(model, os.path.join(out, name))
+    check(model, os.path.join(out, name))
+    updates[name] = {"new_rows": len(df), "trees": len(model.estimators_), "new_labels": new_labels}
+
+if not updates:
+    raise SystemExit("Nothing to update, no version written")
+
+# 3. Copy the artifacts of the models that were not updated
+for name, filenames in MODEL_FILES.items():
+    if name in updates:
+        continue
+    for filename in filenames:
+        if os.path.exists(os.path.join(base, filename)):
+            shutil.copy2(os.path.join(base, filename), os.path.join(out, filename))
+
+with open(os.path.join(out, "manifest.json"), "w") as f:
+    json.dump({
+        "version": args.version,
+        "parent": parent,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "since": args.since,
+        "updates": updates
+    }, f, indent=2)
+
+# 4. Point CURRENT at the new version (replaced atomically, the backend polls it)
+if not args.no_activate:
+    with open(current_path + ".tmp", "w") as f:
+        f.write(args.version + "\n")
+    os.replace(current_path + ".tmp", current_path)
+print(f"✅ Model version {args.version} saved to {out}{'' if args.no_activate else ' and activated'}!")
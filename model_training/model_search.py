@@ -0,0 +1,167 @@
+"""
+Searches model families and sizes for the price or demand model, in parallel processes.
+
+Every candidate (random forests of several sizes and depth limits, histogram gradient
+boosting) is trained on the same data, split and preprocessing as price_model.py /
+demand_model.py. The report lists test MAE and R², training time, predict latency per
+row (one row per call, as a request without batching, and per row of a 256-row batch)
+and pickled size. The most accurate candidate within --max-latency-ms (one-row calls)
+and --max-size-mb is picked; --save writes it where the training script would.
+
+    python model_search.py --model price --jobs 4
+    python model_search.py --model demand --max-latency-ms 5 --max-size-mb 50 --save
+"""
+import argparse
+import json
+import os
+import pickle
+import time
+
+import joblib
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+from data_store import load_table
+
+PRICE_FEATURES = ['state_encoded', 'crop_encoded', 'year', 'month', 'temperature', 'rainfall', 'soil_moisture', 'ndvi']
+NUM_COLS = ["price", "marketing_spend", "competitor_price", "supply"]
+BATCH_ROWS = 256
+
+
+def load_price_data():
+    """(X, y, artifacts) prepared like price_model.py."""
+    df = load_table("prices")
+
+    le_crop, le_state = LabelEncoder(), LabelEncoder()
+    df['crop_encoded'] = le_crop.fit_transform(df['crop'])
+    df['state_encoded'] = le_state.fit_transform(df['state'])
+    return df[PRICE_FEATURES], df['price'], {"crop_encoder.pkl": le_crop, "state_encoder.pkl": le_state}
+
+
+def load_demand_data():
+    """(X, y, artifacts) prepared like demand_model.py."""
+    df = load_table("demand")
+    df.drop(columns=["date", "location"], inplace=True)
+
+    label_encoders = {}
+    for col in ["crop", "state"]:
+        le = LabelEncoder()
+        df[col] = le.fit_transform(df[col].astype(str))
+        label_encoders[col] = le
+
+    X = df.drop(columns=["demand"])
+    scaler = StandardScaler()
+    X[NUM_COLS] = scaler.fit_transform(X[NUM_COLS])
+    return X, df["demand"], {"scalers.pkl": scaler, "label_encoder.pkl": label_encoders}
+
+
+DATASETS = {"price": load_price_data, "demand": load_demand_data}
+
+
+def candidates(model):
+    """(name, estimator) pairs to try; the current model of the training script comes first."""
+    current = 100 if model == "price" else 300
+    yield f"rf-{current}", RandomForestRegressor(n_estimators=current, random_state=42, n_jobs=1)
+    for n_estimators in (50, 100, 200):
+        for max_depth in (8, 12, 16):
+            yield (f"rf-{n_estimators}-d{max_depth}",
+                   RandomForestRegressor(n_estimators=n_estimators, max_depth=max_depth, random_state=42, n_jobs=1))
+    for max_iter in (200, 500):
+        for max_leaf_nodes in (15, 31, 63):
+            yield (f"hgb-{max_iter}-l{max_leaf_nodes}",
+                   HistGradientBoostingRegressor(max_iter=max_iter, max_leaf_nodes=max_leaf_nodes,
+                                                 learning_rate=0.1, random_state=42))
+
+
+def fit(name, estimator, X_train, y_train):
+    """Runs in a worker process; returns the fitted estimator and its training time."""
+    start = time.perf_counter()
+    estimator.fit(X_train, y_train)
+    return name, estimator, time.perf_counter() - start
+
+
+def predict_latency(estimator, X, repeats):
+    """Median seconds per row of one-row calls and of BATCH_ROWS-row calls."""
+    rows = X.iloc[:BATCH_ROWS]
+    single, batch = [], []
+    for i in range(repeats):
+        start = time.perf_counter()
+        estimator.predict(rows.iloc[[i % len(rows)]])
+        single.append(time.perf_counter() - start)
+    for _ in range(max(repeats // 10, 3)):
+        start = time.perf_counter()
+        estimator.predict(rows)
+        batch.append((time.perf_counter() - start) / len(rows))
+    return float(np.median(single)), float(np.median(batch))
+
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--model", choices=sorted(DATASETS), default="price")
+parser.add_argument("--jobs", type=int, default=-1, help="training processes (-1: one per CPU)")
+parser.add_argument("--max-latency-ms", type=float, default=float("inf"), help="budget for a one-row predict")
+parser.add_argument("--max-size-mb", type=float, default=float("inf"), help="budget for the pickled model")
+parser.add_argument("--repeats", type=int, default=50, help="one-row predict calls timed per candidate")
+parser.add_argument("--save", action="store_true", help="save the picked model and its encoders")
+args = parser.parse_args()
+
+# 1. Same data, preprocessing and split as the training script
+X, y, artifacts = DATASETS[args.model]()
+X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+# 2. Train all candidates in parallel processes
+fitted = Parallel(n_jobs=args.jobs)(
+    delayed(fit)(name, estimator, X_train, y_train) for name, estimator in candidates(args.model)
+)
+
+# 3. Score and time them one after another, so latencies are not skewed by other fits
+results = []
+for name, estimator, fit_seconds in fitted:
+    y_pred = estimator.predict(X_test)
+    single, batch = predict_latency(estimator, X_test, args.repeats)
+    results.append({
+        "name": name,
+        "mae": float(mean_absolute_error(y_test, y_pred)),
+        "r2": float(r2_score(y_test, y_pred)),
+        "fit_seconds": fit_seconds,
+        "row_ms": single * 1000,
+        "batch_row_us": batch * 1e6,
+        "size_mb": len(pickle.dumps(estimator, protocol=pickle.HIGHEST_PROTOCOL)) / 1e6,
+        "estimator": estimator
+    })
+
+eligible = [r for r in results if r["row_ms"] <= args.max_latency_ms and r["size_mb"] <= args.max_size_mb]
+best = min(eligible, key=lambda r: r["mae"]) if eligible else None
+
+print(f"{'candidate':<16} | {'MAE':>9} | {'R²':>6} | {'fit (s)':>7} | {'1 row (ms)':>10} | "
+      f"{'batch (µs/row)':>14} | {'size (MB)':>9}")
+for r in sorted(results, key=lambda r: r["mae"]):
+    mark = " ✅" if r is best else ("" if r in eligible else " (over budget)")
+    print(f"{r['name']:<16} | {r['mae']:>9.2f} | {r['r2']:>6.3f} | {r['fit_seconds']:>7.1f} | {r['row_ms']:>10.2f} | "
+          f"{r['batch_row_us']:>14.1f} | {r['size_mb']:>9.1f}{mark}")
+
+with open(f"search_{args.model}.json", "w") as f:
+    json.dump({
+        "budget": {"max_latency_ms": args.max_latency_ms, "max_size_mb": args.max_size_mb},
+        "picked": best["name"] if best else None,
+        "results": [{k: v for k, v in r.items() if k != "estimator"} for r in results]
+    }, f, indent=2)
+
+if best is None:
+    raise SystemExit("No candidate fits the budget")
+print(f"Picked {best['name']} (MAE {best['mae']:.2f}, {best['row_ms']:.2f} ms per row, {best['size_mb']:.1f} MB)")
+
+# 4. Save the picked model under the training script's file names
+if args.save:
+    name = f"{args.model}_model"
+    joblib.dump(best["estimator"], f"{name}.pkl")
+    for filename, artifact in artifacts.items():
+        joblib.dump(artifact, filename)
+    # A flat export of the previous model would shadow the new .pkl in the backend
+    for suffix in (".flat.npy", ".flat.json"):
+        if os.path.exists(name + suffix):
+            os.remove(name + suffix)
+    print(f"✅ Saved {name}.pkl! Run export_flat_models.py again to serve a forest from its flat export.")
@@ -1,16 +1,11 @@
-import pandas as pd
 import joblib
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import LabelEncoder
 from sklearn.model_selection import train_test_split
+from data_store import load_table
 
-# Load dataset
-df = pd.read_csv("final_prices.csv")  # Ensure this file exists
-
-# Feature Engineering
-df['date'] = pd.to_datetime(df['date'])
-df['month'] = df['date'].dt.month
-df['year'] = df['date'].dt.year
+# Load dataset (columnar store of final_prices.csv, with month and year already derived)
+df = load_table("prices")
 
 # Encode categorical variables
 le_crop = LabelEncoder()
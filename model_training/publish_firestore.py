@@ -0,0 +1,179 @@
+"""
+Publishes the monthly prices and demand of the training data, plus the precomputed
+forecasts, to crop_data/<state>/<crop>/<MM-YYYY> in Firestore.
+
+Each document holds the mean price (final_prices.csv) and demand (demand_crops.csv) of
+its state, crop and month, rounded to 2 decimals. Months of the forecast table
+(build_forecast_table.py) that have no data get the forecast price and demand, marked
+with "forecast": true, for the state/crop pairs present in the data.
+
+Documents are replaced, not merged, in batched commits of --batch-size writes, so a
+month published as a forecast loses its forecast fields once data for it is published.
+The write rate starts at --rate writes/s and grows by 50% every 5 minutes (Firestore's
+500/50/5 ramp-up), and failed commits are retried with backoff. Every run writes the
+same documents, so rerunning is safe. After each commit the number of documents written
+is saved to --checkpoint, and a rerun of the same plan resumes after them.
+
+    python publish_firestore.py --credentials ../backend/firebase-adminsdk.json
+    python publish_firestore.py --emulator localhost:8080 --project krishi-mitra
+    python publish_firestore.py --dry-run
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from data_store import load_table
+
+# Firestore allows at most 500 writes per commit
+MAX_BATCH_SIZE = 500
+RAMP_UP_SECONDS = 300
+
+
+def monthly_means(table, field):
+    """{(state, crop, "MM-YYYY"): mean of field} over the rows of a table."""
+    df = load_table(table, ["state", "crop", "year", "month", field])
+    means = df.groupby(["state", "crop", "year", "month"])[field].mean()
+    return {
+        (state, crop, f"{month:02d}-{year}"): round(float(value), 2)
+        for (state, crop, year, month), value in means.items()
+    }
+
+
+def forecast_cells(prefix):
+    """{(state, crop, "MM-YYYY"): (price, demand)} of the forecast table saved under prefix."""
+    with open(f"{prefix}_meta.json") as f:
+        meta = json.load(f)
+    prices = np.load(f"{prefix}_prices.npy", mmap_mode="r")
+    demand = np.load(f"{prefix}_demand.npy", mmap_mode="r")
+
+    cells = {}
+    for s, state in enumerate(meta["states"]):
+        for c, crop in enumerate(meta["crops"]):
+            for m in range(meta["months"]):
+                year = meta["start_year"] + (meta["start_month"] - 1 + m) // 12
+                month = (meta["start_month"] - 1 + m) % 12 + 1
+                cells[(state, crop, f"{month:02d}-{year}")] = (float(prices[s, c, m]), float(demand[s, c, m]))
+    return cells
+
+
+def plan_documents(forecast_prefix=None):
+    """Sorted [(state, crop, "MM-YYYY", data)] of every document to write."""
+    documents = {}
+    for field, means in (("price", monthly_means("prices", "price")), ("demand", monthly_means("demand", "demand"))):
+        for key, value in means.items():
+            documents.setdefault(key, {})[field] = value
+
+    if forecast_prefix:
+        pairs = {(state, crop) for state, crop, _ in documents}
+        for (state, crop, db_month), (price, demand) in forecast_cells(forecast_prefix).items():
+            if (state, crop) in pairs and (state, crop, db_month) not in documents:
+                documents[(state, crop, db_month)] = {
+                    "price": round(price, 2), "demand": round(demand, 2), "forecast": True
+                }
+
+    return [(state, crop, db_month, data) for (state, crop, db_month), data in sorted(documents.items())]
+
+
+def plan_hash(documents):
+    return hashlib.sha256(json.dumps(documents, sort_keys=True).encode()).hexdigest()
+
+
+def commit(db, chunk, retries):
+    """Writes one batch, retrying transient errors with exponential backoff."""
+    from google.api_core import exceptions
+
+    retryable = (exceptions.Aborted, exceptions.DeadlineExceeded, exceptions.InternalServerError,
+                 exceptions.ResourceExhausted, exceptions.ServiceUnavailable)
+    for attempt in range(retries + 1):
+        batch = db.batch()
+        for state, crop, db_month, data in chunk:
+            month_doc_ref = db.collection('crop_data').document(state).collection(crop).document(db_month)
+            # Not merged: the loader owns these documents and replaces what it wrote before
+            batch.set(month_doc_ref, data)
+        try:
+            batch.commit()
+            return
+        except retryable as e:
+            if attempt == retries:
+                raise
+            print(f"⚠ Commit failed ({e}), retrying in {2 ** attempt} s")
+            time.sleep(2 ** attempt)
+
+
+def publish(db, documents, batch_size=MAX_BATCH_SIZE, rate=500, max_rate=None, checkpoint=None, retries=5):
+    """Writes the documents in batched commits; returns the number written by this call."""
+    plan = plan_hash(documents)
+    done = 0
+    if checkpoint and os.path.exists(checkpoint):
+        with open(checkpoint) as f:
+            saved = json.load(f)
+        if saved["plan"] == plan:
+            done = saved["written"]
+            print(f"Resuming after {done} of {len(documents)} documents")
+
+    started = next_commit = time.monotonic()
+    written = 0
+    for start in range(done, len(documents), batch_size):
+        chunk = documents[start:start + batch_size]
+
+        # 500/50/5: the allowed rate grows by 50% every 5 minutes
+        current_rate = rate * 1.5 ** ((time.monotonic() - started) // RAMP_UP_SECONDS)
+        if max_rate:
+            current_rate = min(current_rate, max_rate)
+        time.sleep(max(next_commit - time.monotonic(), 0))
+        commit(db, chunk, retries)
+        next_commit = time.monotonic() + len(chunk) / current_rate
+        written += len(chunk)
+
+        if checkpoint:
+            with open(checkpoint + ".tmp", "w") as f:
+                json.dump({"plan": plan, "written": start + len(chunk)}, f)
+            os.replace(checkpoint + ".tmp", checkpoint)
+        print(f"   {start + len(chunk)}/{len(documents)} documents written")
+    return written
+
+
+def connect(args):
+    if args.emulator:
+        # The Firestore client talks to the emulator when FIRESTORE_EMULATOR_HOST is set
+        from google.auth.credentials import AnonymousCredentials
+        from google.cloud import firestore
+
+        os.environ["FIRESTORE_EMULATOR_HOST"] = args.emulator
+        return firestore.Client(project=args.project, credentials=AnonymousCredentials())
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    firebase_admin.initialize_app(credentials.Certificate(args.credentials))
+    return firestore.client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--credentials", default="../backend/firebase-adminsdk.json", help="service account key")
+    parser.add_argument("--emulator", help="host:port of a Firestore emulator to write to instead")
+    parser.add_argument("--project", default="krishi-mitra", help="project id used with --emulator")
+    parser.add_argument("--forecast", default="forecast", help="prefix of the forecast table ('' to skip)")
+    parser.add_argument("--batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--rate", type=float, default=500, help="writes/s at the start of the ramp-up")
+    parser.add_argument("--max-rate", type=float, help="cap of the ramped-up rate")
+    parser.add_argument("--checkpoint", default="publish_checkpoint.json")
+    parser.add_argument("--dry-run", action="store_true", help="only count the documents")
+    args = parser.parse_args()
+
+    if not 0 < args.batch_size <= MAX_BATCH_SIZE:
+        parser.error(f"--batch-size must be between 1 and {MAX_BATCH_SIZE}")
+
+    forecast_prefix = args.forecast if args.forecast and os.path.exists(f"{args.forecast}_meta.json") else None
+    documents = plan_documents(forecast_prefix)
+    forecasts = sum(1 for *_, data in documents if data.get("forecast"))
+    print(f"{len(documents)} documents ({len(documents) - forecasts} from the data, {forecasts} forecast)")
+
+    if not args.dry_run:
+        written = publish(connect(args), documents, args.batch_size, args.rate, args.max_rate, args.checkpoint)
+        print(f"✅ Published {written} documents to crop_data!")
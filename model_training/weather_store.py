@@ -0,0 +1,66 @@
+"""
+Builds the backend's weather feature store from the locations of final_prices.csv.
+
+Writes, for the columns temperature, rainfall, soil_moisture and ndvi:
+    weather_by_state.npy     (states + 1) x 12 months x columns: mean per state and
+                             calendar month, the last row being the mean per month
+                             (for states not in the data)
+    weather_by_location.npy  locations x 12 x columns: mean per location and calendar
+                             month, months without data filled from the state's mean
+    weather_locations.npy    locations x (latitude, longitude)
+    weather_meta.json        states, (state, location) names and columns
+Copy them next to the backend's .pkl files. The state means are the ones of
+climatology.py, so predictions don't change.
+
+    python weather_store.py
+"""
+import json
+
+import numpy as np
+
+from data_store import load_table
+
+WEATHER_COLS = ["temperature", "rainfall", "soil_moisture", "ndvi"]
+MONTHS = np.arange(1, 13)
+
+
+def monthly_means(df, keys):
+    """keys x 12 x columns array of the mean per key and calendar month (NaN without rows)."""
+    means = df.groupby(keys + ["month"])[WEATHER_COLS].mean()
+    index = means.index.droplevel("month").unique()
+    cube = np.full((len(index), 12, len(WEATHER_COLS)), np.nan)
+    positions = index.get_indexer(means.index.droplevel("month"))
+    cube[positions, means.index.get_level_values("month") - 1] = means.to_numpy()
+    return index, cube
+
+
+# 1. Load data (columnar store of final_prices.csv)
+df = load_table("prices", ["state", "location", "latitude", "longitude", "month"] + WEATHER_COLS)
+
+# 2. Means per calendar month, per state and month, per location and month
+by_month = df.groupby("month")[WEATHER_COLS].mean().reindex(MONTHS).fillna(df[WEATHER_COLS].mean())
+states, by_state = monthly_means(df, ["state"])
+locations, by_location = monthly_means(df, ["state", "location"])
+
+# 3. Fallbacks like climatology.py, per value: a state month without a value gets the
+# month's mean. Locations fall back to their state's mean, then the month's mean.
+by_state = np.where(np.isnan(by_state), by_month.to_numpy()[None], by_state)
+by_state = np.concatenate([by_state, by_month.to_numpy()[None]])
+
+state_of_location = states.get_indexer(locations.get_level_values("state"))
+by_location = np.where(np.isnan(by_location), by_state[state_of_location], by_location)
+by_location = np.where(np.isnan(by_location), by_month.to_numpy()[None], by_location)
+
+coordinates = df.groupby(["state", "location"])[["latitude", "longitude"]].mean().reindex(locations)
+
+# 4. Persist
+np.save("weather_by_state.npy", by_state)
+np.save("weather_by_location.npy", by_location)
+np.save("weather_locations.npy", coordinates.to_numpy())
+with open("weather_meta.json", "w") as f:
+    json.dump({
+        "columns": WEATHER_COLS,
+        "states": list(states),
+        "locations": [list(location) for location in locations]
+    }, f, indent=2)
+print(f"✅ Weather store saved! ({len(states)} states, {len(locations)} locations)")